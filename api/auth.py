@@ -1,35 +1,114 @@
 # api/auth.py
-import os
-import requests
+import threading
 import time
 
-CLIENT_ID = os.getenv("06435202-5497-4fd5-ad8b-d5d0e8717b0d")
-CLIENT_SECRET = os.getenv("Dio1p74JoaDukguN991rojAq")
-REFRESH_TOKEN = os.getenv("eyJraWQiOiI2MjAiLCJhbGciOiJSUzUxMiJ9.eyJzYyI6ImNhbGxzLnYyLmluaXRpYXRlIGZheC52MS5yZWFkIHdlYnJ0Yy52MS53cml0ZSBjci52MS5yZWFkIHZvaWNlLWFkbWluLnYxLndyaXRlIHZvaWNlbWFpbC52MS52b2ljZW1haWxzLnJlYWQgdXNlcnMudjEucmVhZCB2b2ljZW1haWwudjEubm90aWZpY2F0aW9ucy5tYW5hZ2UgcHJlc2VuY2UudjEud3JpdGUgbWVzc2FnaW5nLnYxLndyaXRlIGZheC52MS53cml0ZSByZWNvcmRpbmcudjEubm90aWZpY2F0aW9ucy5tYW5hZ2UgY2FsbC1oaXN0b3J5LnYxLm5vdGlmaWNhdGlvbnMubWFuYWdlIG1lc3NhZ2luZy52MS5ub3RpZmljYXRpb25zLm1hbmFnZSB1c2Vycy52MS5saW5lcy5yZWFkIHdlYnJ0Yy52MS5yZWFkIHZvaWNlLWFkbWluLnYxLnJlYWQgY2FsbC1ldmVudHMudjEuZXZlbnRzLnJlYWQgZmF4LnYxLm5vdGlmaWNhdGlvbnMubWFuYWdlIHJlY29yZGluZy52MS5yZWFkIHByZXNlbmNlLnYxLm5vdGlmaWNhdGlvbnMubWFuYWdlIG1lc3NhZ2luZy52MS5zZW5kIHByZXNlbmNlLnYxLnJlYWQgdm9pY2VtYWlsLnYxLnZvaWNlbWFpbHMud3JpdGUgY2FsbC1jb250cm9sLnYxLmNhbGxzLmNvbnRyb2wgY2FsbC1ldmVudHMudjEubm90aWZpY2F0aW9ucy5tYW5hZ2UgbWVzc2FnaW5nLnYxLnJlYWQgaWRlbnRpdHk6c2NpbS5tZSIsInN1YiI6IjgzNDY1OTU0ODkxNTU2MDY4ODkiLCJhdWQiOiIwNjQzNTIwMi01NDk3LTRmZDUtYWQ4Yi1kNWQwZTg3MTdiMGQiLCJvZ24iOiJwd2QiLCJscyI6IjEzNmQyNmI2LTk2MTEtNGZjOS05NTVkLWJmZDQwMzM5OTc1OCIsInR5cCI6ImMiLCJleHAiOjE3NTI0MzY3NTUsImlhdCI6MTc1MjQzNjE1NSwidXJpIjoiaHR0cHM6Ly9vYXV0aC5wc3Rtbi5pby92MS9jYWxsYmFjayIsImp0aSI6IjkyOThhZGI3LTdmYTktNDc5Yi1hMmYzLTQwYzJiYWRjZmMxMCIsImxvYSI6M30.SwWN7MuSOSKpIbn-TkGMYzgIS4IVytWeJL4OdED3GgehIABm1UHAMTbfz7QhPrPyDrv7UtcdhnwSXpLXthvKjefnJC8BfXy5rXIH73r2a2LeFPr5DF01supk_7Q0W6v7XbtB-lBVhEvqKOGb4n7so6A-j8W2C94Ym6cTDtWS7WlI5xM79fqg6QOnJC183XcucnTD7qm-EQF6YHlPUK4-qWLgJHqk5dhwzO1zZTIXNF68Iu63aILbYkzeyqRvPswiLR_tblWog1ljI5rZYy_oTxwLA0UdAp9RCLzmStBDRRP3iwUSUlgbvOZV_hKG5-xPOOq_XN9Ho6TySM9wMqhI7g")
+import config
+from config import TOKEN_REFRESH_MARGIN
+from api import client
+from utils import metrics
+
+TOKEN_URL = "https://api.getgo.com/oauth/v2/token"
+RETRY_DELAY = 30  # seconds between failed background refreshes
+
+
+class TokenManager:
+    """Keeps a valid access token, refreshing ahead of expiry on a daemon thread.
+
+    Readers get the current token without waiting; only a missing or fully
+    expired token makes a caller block, and then on a single shared refresh.
+    """
+
+    def __init__(self, access_token=None, refresh_token=None, margin=TOKEN_REFRESH_MARGIN):
+        self.margin = margin
+        self._access_token = access_token
+        self._refresh_token = refresh_token
+        # A static token has no known expiry; it is trusted until a refresh replaces it or a 401 invalidates it
+        self._expires_at = float("inf") if access_token else 0
+        self._refresh_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def can_refresh(self):
+        return bool(self._refresh_token and config.CLIENT_ID and config.CLIENT_SECRET)
+
+    def get_token(self):
+        self._ensure_thread()
+        token = self._access_token
+        if token and time.time() < self._expires_at:
+            return token
+        if not self.can_refresh:
+            if token:
+                return token
+            raise RuntimeError("No GoTo access token configured and no refresh credentials available")
+        return self.refresh()
+
+    def refresh(self, force=False):
+        # Single-flight: whoever holds the lock refreshes, everyone queued behind reuses the result
+        with self._refresh_lock:
+            if not force and self._access_token and time.time() < self._expires_at - self.margin:
+                return self._access_token
+            with metrics.timer("auth"):
+                res = client.post(TOKEN_URL, data={
+                    "grant_type": "refresh_token",
+                    "refresh_token": self._refresh_token,
+                    "client_id": config.CLIENT_ID,
+                    "client_secret": config.CLIENT_SECRET,
+                })
+            metrics.count("token_refreshes_total", status=res.status_code)
+            res.raise_for_status()
+            tokens = res.json()
+
+            self._access_token = tokens["access_token"]
+            self._expires_at = time.time() + tokens.get("expires_in", 3600)
+            self._refresh_token = tokens.get("refresh_token") or self._refresh_token
+            return self._access_token
+
+    def invalidate(self, token=None):
+        # Called on 401 with the rejected token. If another thread has already replaced
+        # it, the new token stands, so concurrent 401s share one refresh.
+        if self.can_refresh and (token is None or token == self._access_token):
+            self._expires_at = 0
+            self._wake.set()
+
+    def _ensure_thread(self):
+        if self._thread is None and self.can_refresh:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        # A static seed token has unknown expiry, so the first refresh happens right away
+        next_refresh = time.time() if self._expires_at == float("inf") else self._expires_at - self.margin
+        while True:
+            self._wake.wait(max(0.0, next_refresh - time.time()))
+            self._wake.clear()
+            try:
+                self.refresh(force=self._expires_at == float("inf"))
+                next_refresh = self._expires_at - self.margin
+            except Exception as e:
+                print("🔑 Token refresh failed:", e)
+                next_refresh = time.time() + RETRY_DELAY
+
+
+_token_manager = None
+_token_manager_lock = threading.Lock()
+
+
+def get_token_manager():
+    # Built on first use, so importing this module never reads credentials
+    global _token_manager
+    with _token_manager_lock:
+        if _token_manager is None:
+            _token_manager = TokenManager(config.ACCESS_TOKEN, config.REFRESH_TOKEN)
+        return _token_manager
 
-TOKEN_CACHE = {
-    "access_token": None,
-    "expires_at": 0
-}
 
 def get_access_token():
-    now = time.time()
-    if TOKEN_CACHE["access_token"] and TOKEN_CACHE["expires_at"] > now + 60:
-        return TOKEN_CACHE["access_token"]
-
-    url = "https://api.getgo.com/oauth/v2/token"
-    data = {
-        "grant_type": "refresh_token",
-        "refresh_token": REFRESH_TOKEN,
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET
-    }
-
-    res = requests.post(url, data=data)
-    res.raise_for_status()
-    tokens = res.json()
-
-    TOKEN_CACHE["access_token"] = tokens["access_token"]
-    TOKEN_CACHE["expires_at"] = now + tokens.get("expires_in", 3600)
-
-    return TOKEN_CACHE["access_token"]
+    return get_token_manager().get_token()
+
+
+def invalidate_access_token(token=None):
+    get_token_manager().invalidate(token)
@@ -0,0 +1,167 @@
+# api/cache.py
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from config import CACHE_ITEM_BYTES, CACHE_MAX_BYTES, CACHE_MAX_ENTRIES
+from api.singleflight import SingleFlight
+from api.store import parse_ts
+from utils import metrics
+
+_MISSING = object()
+
+
+def _estimate_size(value):
+    # Runs on every insert, so it only looks at lengths, never serialises the value
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple, dict, set)):
+        return 64 + len(value) * CACHE_ITEM_BYTES
+    return 64
+
+
+class TTLCache:
+    """Process-wide LRU cache with per-entry expiry, bounded by entries and bytes."""
+
+    def __init__(self, name, ttl, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()   # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, match=None):
+        # match: None (everything), an exact key, or a predicate on keys
+        with self._lock:
+            if match is None:
+                keys = list(self._data)
+            elif callable(match):
+                keys = [k for k in self._data if match(k)]
+            else:
+                keys = [match] if match in self._data else []
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _drop(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+_flights = {}   # cache name -> SingleFlight used by @cached
+
+
+def get_cache(name, ttl=60, **kwargs):
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = TTLCache(name, ttl, **kwargs)
+        return _caches[name]
+
+
+def all_stats():
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [c.stats() for c in caches]
+
+
+def _collect_metrics():
+    samples = []
+    for stats in all_stats():
+        labels = {"cache": stats["name"]}
+        for field in ("hits", "misses", "evictions", "entries", "bytes", "hit_rate"):
+            samples.append((f"cache_{field}", labels, stats[field]))
+    for name, flights in list(_flights.items()):
+        shared = flights.stats()
+        samples.append(("singleflight_executed", {"cache": name}, shared["executed"]))
+        samples.append(("singleflight_shared", {"cache": name}, shared["shared"]))
+    return samples
+
+
+metrics.registry.register_collector(_collect_metrics)
+
+
+def invalidate(name, match=None):
+    cache = _caches.get(name)
+    return cache.invalidate(match) if cache else 0
+
+
+def range_key(user_key, start_time, end_time):
+    # Equivalent ranges ("...Z", "+00:00", datetimes) share one entry
+    fmt = "%Y-%m-%dT%H:%M:%SZ"
+    return (user_key, parse_ts(start_time).strftime(fmt), parse_ts(end_time).strftime(fmt))
+
+
+def cached(name, ttl, key=None, **kwargs):
+    # Concurrent misses on the same key share one call to fn (see api/singleflight.py)
+    def decorator(fn):
+        cache = get_cache(name, ttl, **kwargs)
+        flights = _flights[name] = SingleFlight()
+
+        def load(cache_key, args):
+            # Re-checked inside the flight: a caller that just missed may find the leader's result
+            value = cache.get(cache_key, _MISSING)
+            if value is _MISSING:
+                value = fn(*args)
+                cache.set(cache_key, value)
+            return value
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            cache_key = key(*args) if key else args
+            value = cache.get(cache_key, _MISSING)
+            if value is _MISSING:
+                value = flights.do(cache_key, load, cache_key, args)
+            return value
+
+        wrapper.cache = cache
+        wrapper.flights = flights
+        return wrapper
+    return decorator
@@ -1,29 +1,158 @@
 # api/calls.py
-import requests
-import pandas as pd
-from datetime import timezone
-from config import ACCESS_TOKEN, ACCOUNT_KEY, BASE_URL
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import config
+from config import CACHE_TTL_CALLS, SYNC_CHUNK_DAYS, SYNC_CHUNK_WORKERS
+from api.cache import cached, range_key
+from api import client
+from api.concurrency import run_bounded
+from api.jsonstream import JsonItemStream
+from api.store import get_store, parse_ts
+from utils import metrics
 
-def get_user_calls(user_key, start_time, end_time):
-    url = f"{BASE_URL}/call-history/v1/calls"
-    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
+PAGE_SIZE = 100
+STREAM_CHUNK_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _to_iso(value):
+    return parse_ts(value).isoformat().replace("+00:00", "Z")
 
-    start_iso = pd.to_datetime(start_time).replace(tzinfo=timezone.utc).isoformat().replace("+00:00", "Z")
-    end_iso = pd.to_datetime(end_time).replace(tzinfo=timezone.utc).isoformat().replace("+00:00", "Z")
 
+def _call_history_request(user_key, start_time, end_time, page_size):
+    url = f"{config.BASE_URL}/call-history/v1/calls"
     params = {
         "userKey": user_key,
-        "accountKey": ACCOUNT_KEY,
-        "startTime": start_iso,
-        "endTime": end_iso,
-        "pageSize": 100
+        "accountKey": config.ACCOUNT_KEY,
+        "startTime": _to_iso(start_time),
+        "endTime": _to_iso(end_time),
+        "pageSize": page_size,
     }
+    return url, params
+
+
+def _stream_page(url, params):
+    # Yields items as they are parsed off the socket; returns the next page marker
+    started = time.monotonic()
+    with client.get(url, params=params, authenticated=True, stream=True) as res:
+        res.raise_for_status()
+        stream = JsonItemStream(res.iter_content(STREAM_CHUNK_SIZE))
+        yield from stream
+    elapsed = time.monotonic() - started
+    metrics.count("upstream_bytes_total", stream.bytes_read, host=urlsplit(url).netloc)
+    metrics.count("call_records_total", stream.count)
+    metrics.observe("stage_seconds", elapsed, stage="fetch_page")
+    logger.debug(
+        "call-history page user=%s items=%d bytes=%d latency=%.0fms",
+        params["userKey"], stream.count, stream.bytes_read, elapsed * 1000,
+    )
+    return stream.meta.get("nextPageMarker")
+
+
+def _fetch_page(url, params):
+    items = []
+    page = _stream_page(url, params)
+    try:
+        while True:
+            items.append(next(page))
+    except StopIteration as done:
+        return items, done.value
+
+
+def iter_user_call_pages(user_key, start_time, end_time, page_size=PAGE_SIZE, prefetch=True):
+    # Follows nextPageMarker; with prefetch the next page downloads while the caller handles this one
+    url, params = _call_history_request(user_key, start_time, end_time, page_size)
+
+    if not prefetch:
+        while True:
+            items, marker = _fetch_page(url, params)
+            yield items
+            if not marker:
+                return
+            params = {**params, "pageMarker": marker}
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-prefetch") as pool:
+        pending = pool.submit(_fetch_page, url, params)
+        while pending is not None:
+            items, marker = pending.result()
+            pending = None
+            if marker:
+                params = {**params, "pageMarker": marker}
+                pending = pool.submit(_fetch_page, url, params)
+            yield items
+
+
+def iter_user_calls(user_key, start_time, end_time, page_size=PAGE_SIZE):
+    # Record-at-a-time across all pages. The next page is stream-parsed in the background
+    # while the caller stores this one, so memory stays bounded by two pages
+    for page in iter_user_call_pages(user_key, start_time, end_time, page_size):
+        yield from page
+
+
+def live_range_key(user_key, start_time, end_time):
+    # range_key plus the nurse's last event mark: calls ingested by any process start a fresh entry
+    return (*range_key(user_key, start_time, end_time), get_store().event_mark(user_key))
+
+
+@cached("sync", CACHE_TTL_CALLS, key=live_range_key)
+def sync_user_calls(user_key, start_time, end_time):
+    # Pulls only the windows the local store is missing (plus the open "today" window).
+    # Long gaps are split into Eastern-day chunks fetched in parallel; each chunk is
+    # marked synced as it lands, so a retry after a failure only refetches what is left.
+    store = get_store()
+    now = datetime.now(timezone.utc)
+    windows = store.missing_windows(user_key, start_time, end_time, now, max_days=SYNC_CHUNK_DAYS)
+
+    def sync_window(window):
+        window_start, window_end, closed_days = window
+        # Pages stream into the store while the next one downloads; the window is never held whole.
+        # Calls are keyed on (user_key, call_id), so overlaps at chunk boundaries are stored once.
+        with metrics.timer("fetch"):
+            fetched = store.add_calls(user_key, iter_user_calls(user_key, window_start, window_end))
+        store.mark_synced(user_key, closed_days, synced_until=now if window_end >= now else None)
+        return fetched
+
+    if len(windows) <= 1:
+        return sum(sync_window(window) for window in windows)
+
+    fetched, errors = 0, []
+    for _, count, error in run_bounded(sync_window, windows, max_workers=SYNC_CHUNK_WORKERS):
+        if error is None:
+            fetched += count
+        else:
+            errors.append(error)
+    if errors:
+        raise errors[0]
+    return fetched
+
+
+@cached("calls", CACHE_TTL_CALLS, key=live_range_key)
+def get_user_calls(user_key, start_time, end_time):
+    sync_user_calls(user_key, start_time, end_time)
+    return get_store().load_calls(user_key, start_time, end_time)
+
+
+def get_user_call_frame(user_key, start_time, end_time, nurse_names=None):
+    # Canonical compact frame built from the store's typed columns (no JSON payloads decoded)
+    from utils.processing import normalize_call_rows  # pandas, only for callers that want frames
+    sync_user_calls(user_key, start_time, end_time)
+    rows = get_store().load_call_rows([user_key], start_time, end_time)
+    return normalize_call_rows(rows, nurse_names)
+
+
+def sync_calls_for_users(user_keys, start_time, end_time, max_workers=None):
+    # Brings the store up to date for many nurses at once; yields (user_key, fetched, error)
+    # as each completes, so views can show progress and then read every nurse in one query
+    def sync(user_key):
+        return sync_user_calls(user_key, start_time, end_time)
+
+    yield from run_bounded(sync, user_keys, max_workers=max_workers)
 
-    print("📞 Fetching calls with:", params)
-    res = requests.get(url, headers=headers, params=params)
-    print("🔍 Status:", res.status_code)
-    print("📦 Raw:", res.text)
 
-    res.raise_for_status()
-    data = res.json()
-    return data.get("items", [])
+def invalidate_user_calls(user_key=None):
+    match = None if user_key is None else (lambda k: k[0] == user_key)
+    return sync_user_calls.cache.invalidate(match) + get_user_calls.cache.invalidate(match)
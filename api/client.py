@@ -0,0 +1,151 @@
+# api/client.py
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    FETCH_MAX_WORKERS, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, HTTP_MAX_RETRIES, HTTP_TIMEOUT,
+)
+from api.concurrency import rate_limiter, upstream_slots
+from utils import metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Safe to resend after a timeout or 5xx. Other methods (e.g. the OAuth refresh POST, whose
+# token may already be spent) only retry when the server provably did not act on them.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    # One keep-alive pool for every GoTo endpoint; upstream_slots caps in-flight requests at its size
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=FETCH_MAX_WORKERS, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+            _session = session
+        return _session
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt):
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+def _release_on_close(res):
+    # A streamed body holds its connection until the response is closed, so it holds its slot too
+    original = res.close
+    held = {"slot": True}
+
+    def close():
+        try:
+            original()
+        finally:
+            if held.pop("slot", False):
+                upstream_slots.release()
+
+    res.close = close
+
+
+def _send(session, method, url, **kwargs):
+    # Holds an upstream slot for the whole exchange; a streamed body keeps it until closed
+    upstream_slots.acquire()
+    try:
+        rate_limiter.acquire(url)
+        res = session.request(method, url, **kwargs)
+        if not kwargs.get("stream"):
+            res.content   # read the body while the slot is held
+    except BaseException:
+        upstream_slots.release()
+        raise
+    if kwargs.get("stream"):
+        _release_on_close(res)
+    else:
+        upstream_slots.release()
+    return res
+
+
+def _access_token():
+    # Imported lazily: api.auth itself posts through this client
+    from api.auth import get_access_token
+    return get_access_token()
+
+
+def request(method, url, retries=HTTP_MAX_RETRIES, timeout=HTTP_TIMEOUT, authenticated=False, **kwargs):
+    # `retries` bounds retries on errors; a 401 re-auth gets one extra attempt of its own
+    session = get_session()
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    headers = kwargs.pop("headers", None) or {}
+    reauthed = False
+    host = urlsplit(url).netloc
+    attempt = 0
+    while True:
+        if authenticated:
+            # Before taking a slot: a token refresh makes its own request
+            token = _access_token()
+            headers = {**headers, "Authorization": f"Bearer {token}"}
+        try:
+            res = _send(session, method, url, timeout=timeout, headers=headers, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.count("upstream_errors_total", host=host, error=type(e).__name__)
+            if attempt >= retries or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                raise
+            time.sleep(_backoff(attempt))
+            attempt += 1
+            continue
+        # Time to response headers; streamed bodies are counted by their readers
+        metrics.observe("upstream_request_seconds", res.elapsed.total_seconds(), host=host, method=method)
+        metrics.count("upstream_requests_total", host=host, status=res.status_code)
+        if not kwargs.get("stream"):
+            metrics.count("upstream_bytes_total", len(res.content), host=host)
+
+        if res.status_code == 401 and authenticated and not reauthed:
+            from api.auth import get_token_manager
+            token_manager = get_token_manager()
+            if token_manager.can_refresh:
+                reauthed = True
+                res.close()
+                token_manager.invalidate(token)
+                continue
+
+        if res.status_code in RETRY_STATUSES and attempt < retries and (idempotent or res.status_code == 429):
+            metrics.count("upstream_retries_total", host=host, status=res.status_code)
+            delay = _retry_after(res)
+            res.close()
+            time.sleep(min(delay, HTTP_BACKOFF_MAX * 4) if delay is not None else _backoff(attempt))
+            attempt += 1
+            continue
+        return res
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -0,0 +1,57 @@
+# api/concurrency.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from config import FETCH_MAX_WORKERS, FETCH_RATE_LIMIT
+
+
+class RateLimiter:
+    """Token bucket limiting request starts per host."""
+
+    def __init__(self, rate_per_sec, burst=None):
+        self.rate = float(rate_per_sec)
+        self.burst = float(burst or max(1, rate_per_sec))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        if self.rate <= 0:
+            return
+        host = urlsplit(url).netloc
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+
+rate_limiter = RateLimiter(FETCH_RATE_LIMIT)
+
+# One bound on in-flight upstream requests for the whole process. Every request takes a
+# slot, whichever pool it runs in (nurse workers, per-nurse chunk workers, page prefetchers,
+# webhook threads), so nested fan-out can add threads but never more open connections.
+upstream_slots = threading.BoundedSemaphore(FETCH_MAX_WORKERS)
+
+
+def run_bounded(fn, items, max_workers=None):
+    # Yields (item, result, error) in completion order; one failure never cancels the rest
+    items = list(items)
+    if not items:
+        return
+    workers = max(1, min(max_workers or FETCH_MAX_WORKERS, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
@@ -0,0 +1,153 @@
+# api/events.py
+# Live call-event ingestion: notifications are appended to the call store as they
+# arrive, so open-day views read them from the store instead of re-querying GoTo.
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import EVENTS_BATCH_SIZE, EVENTS_STALE_SECONDS
+from api.store import get_store
+
+HEARTBEAT_TYPES = {"keepalive", "heartbeat", "ping", "subscription"}
+
+
+def parse_event(event):
+    """Returns [(user_key, call), ...] for the notification shapes we accept:
+
+    - {"userKey": ..., "call": {...}}                               single call
+    - {"type": "call-history", "content": {"userKey": ..., "items": [...]}}
+    - a call-history item carrying its own "userKey"
+    - {"type": "keepalive"} (and other HEARTBEAT_TYPES), which carry no calls
+    """
+    if not isinstance(event, dict) or event.get("type") in HEARTBEAT_TYPES:
+        return []
+    content = event.get("content") if isinstance(event.get("content"), dict) else event
+    user_key = content.get("userKey") or content.get("user_key") or event.get("userKey")
+    if not user_key:
+        return []
+    if isinstance(content.get("items"), list):
+        calls = content["items"]
+    elif isinstance(content.get("call"), dict):
+        calls = [content["call"]]
+    elif content.get("startTime"):
+        calls = [content]
+    else:
+        calls = []
+    return [(user_key, call) for call in calls if isinstance(call, dict) and call.get("startTime")]
+
+
+def ingest_events(events, store=None, on_calls=()):
+    # Synchronous path: append calls and mark rollups dirty, then bump the nurses' event
+    # marks, which are part of the call and summary cache keys in every process
+    store = store or get_store()
+    by_user = {}
+    for event in events:
+        for user_key, call in parse_event(event):
+            by_user.setdefault(user_key, []).append(call)
+    for user_key, calls in by_user.items():
+        store.add_calls(user_key, calls)
+    store.mark_events(by_user)
+    # Listeners run only after everything is stored; a failing listener never costs calls
+    for listener in on_calls:
+        for user_key, calls in by_user.items():
+            try:
+                listener(user_key, calls)
+            except Exception as e:
+                print("📡 Event listener failed:", e)
+    return sum(len(calls) for calls in by_user.values())
+
+
+class EventIngestor:
+    """Background consumer for a notification feed.
+
+    While events (or heartbeats) keep arriving, the store is told the feed is live,
+    so open-day windows already synced once are not re-fetched from the API, by this
+    process or the dashboard. A feed that goes quiet for EVENTS_STALE_SECONDS, or a
+    batch that fails to store, falls back to polling.
+    Other layers hook in with subscribe(): on_calls(user_key, calls) sees each stored
+    batch and on_tick() runs about once a second (see logic.alerts.attach_alerts).
+    """
+
+    def __init__(self, store=None, batch_size=EVENTS_BATCH_SIZE, stale_after=EVENTS_STALE_SECONDS):
+        self.store = store or get_store()
+        self.batch_size = batch_size
+        self.stale_after = stale_after
+        self.ingested = 0
+        self.last_seen = None
+        self.on_calls = []
+        self.on_tick = []
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, on_calls=None, on_tick=None):
+        # Idempotent: registering the same callback twice keeps one copy
+        with self._lock:
+            if on_calls is not None and on_calls not in self.on_calls:
+                self.on_calls = [*self.on_calls, on_calls]
+            if on_tick is not None and on_tick not in self.on_tick:
+                self.on_tick = [*self.on_tick, on_tick]
+        return self
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-ingest", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, event):
+        self._queue.put(event)
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=1)]
+            except queue.Empty:
+                self._check_stale()
+                self._tick()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self.last_seen is None or self.store.live_since is None:
+                self.store.set_live(datetime.now(timezone.utc))
+            else:
+                self.store.touch_feed()
+            self.last_seen = time.monotonic()
+            try:
+                self.ingested += ingest_events(batch, self.store, self.on_calls)
+            except Exception as e:
+                # The batch is lost: leave live mode, so the next sync re-fetches the open
+                # day from the high-water mark instead of trusting the feed for it
+                print("📡 Event ingestion failed, open days will be re-fetched:", e)
+                self.store.set_live(None)
+                self.last_seen = None
+            self._tick()
+
+    def _tick(self):
+        for listener in self.on_tick:
+            try:
+                listener()
+            except Exception as e:
+                print("📡 Event tick listener failed:", e)
+
+    def _check_stale(self):
+        if self.last_seen is not None and time.monotonic() - self.last_seen > self.stale_after:
+            self.store.set_live(None)
+            self.last_seen = None
+
+
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+
+def get_ingestor():
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = EventIngestor().start()
+        return _ingestor
@@ -0,0 +1,105 @@
+# api/jsonstream.py
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class JsonItemStream:
+    """Incrementally parses a JSON object body, yielding the elements of one array
+    member as they arrive. Other top-level members land in ``meta`` once parsed,
+    so e.g. ``nextPageMarker`` is available after iteration regardless of where
+    it appears in the body. Memory held is one chunk plus one element.
+    """
+
+    def __init__(self, chunks, array_key="items"):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.array_key = array_key
+        self.meta = {}
+        self.bytes_read = 0
+        self.count = 0
+
+    # --- Buffer handling
+    def _more(self):
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            self._buf = self._buf[self._pos:] + self._utf8.decode(b"", final=True)
+            self._pos = 0
+            return True
+        self.bytes_read += len(chunk)
+        text = self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._more():
+                raise ValueError("Unexpected end of JSON body")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.bytes_read}, got {self._buf[self._pos]!r}")
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # A number touching the end of the buffer (or followed by "." / "e") may be truncated
+                truncated = end == len(self._buf) or (
+                    isinstance(value, (int, float)) and self._buf[end] in _NUMBER_CHARS
+                )
+                if not truncated or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._more()
+
+    # --- Parsing
+    def __iter__(self):
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == self.array_key and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        item = self._value()
+                        self.count += 1
+                        yield item
+                        if self._peek() == ",":
+                            self._pos += 1
+                            continue
+                        self._expect("]")
+                        break
+            else:
+                self.meta[key] = self._value()
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("}")
+            return
@@ -0,0 +1,98 @@
+# api/prefetch.py
+# Background warm-up of the sidebar presets: every nurse's Day/Week/Month windows
+# are synced into the store (and the sync cache) before anyone asks.
+import threading
+import time
+from collections import Counter
+
+from config import PREFETCH_INTERVAL
+from api.calls import sync_calls_for_users
+from api.users import get_users
+from utils.ranges import PRESETS, eastern_bounds, preset_range
+
+USAGE_DECAY = 0.5   # per run, so recent usage outweighs old habits
+
+
+class Prefetcher:
+    """Runs at startup and then every `interval` seconds.
+
+    Presets and nurses are visited in order of recent use (record_use), so the
+    views people actually open are warm first. Failures are counted, not raised;
+    the next run retries whatever is still missing. `on_synced` callables run after
+    each preset is synced (the dashboard passes logic.rollups.refresh_rollups).
+    """
+
+    def __init__(self, interval=PREFETCH_INTERVAL, presets=PRESETS, on_synced=()):
+        self.interval = interval
+        self.presets = tuple(presets)
+        self.on_synced = tuple(on_synced)
+        self.usage = Counter()
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record_use(self, preset=None, user_key=None):
+        with self._lock:
+            if preset in self.presets:
+                self.usage[("preset", preset)] += 1
+            if user_key:
+                self.usage[("nurse", user_key)] += 1
+
+    def _ranked(self, kind, items):
+        # Most used first; ties keep the given order
+        with self._lock:
+            return sorted(items, key=lambda item: -self.usage[(kind, item)])
+
+    def run_once(self):
+        started = time.monotonic()
+        user_keys = self._ranked("nurse", [u["userKey"] for u in get_users()])
+        fetched = failed = 0
+        for preset in self._ranked("preset", self.presets):
+            shift_start_str, shift_end_str = eastern_bounds(*preset_range(preset))
+            for _, count, error in sync_calls_for_users(user_keys, shift_start_str, shift_end_str):
+                if error is None:
+                    fetched += count
+                else:
+                    failed += 1
+            for callback in self.on_synced:
+                callback()
+
+        with self._lock:
+            for key in list(self.usage):
+                self.usage[key] *= USAGE_DECAY
+        self.last_run = {
+            "presets": len(self.presets),
+            "nurses": len(user_keys),
+            "fetched": fetched,
+            "failed": failed,
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        return self.last_run
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and self.interval > 0:
+                self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print("🔄 Prefetch failed:", e)
+            time.sleep(self.interval)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher(on_synced=()):
+    # on_synced only applies to the first call, which builds and starts the prefetcher
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(on_synced=on_synced).start()
+        return _prefetcher
@@ -0,0 +1,314 @@
+# api/store.py
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from config import CALL_STORE_PATH, EVENTS_STALE_SECONDS, STORE_OPEN_LOOKBACK_MINUTES
+
+EASTERN = ZoneInfo("US/Eastern")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    user_key    TEXT NOT NULL,
+    call_id     TEXT NOT NULL,
+    day         TEXT NOT NULL,
+    hour        INTEGER NOT NULL DEFAULT 0,
+    start_ts    INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    direction   TEXT,
+    caller      TEXT,
+    callee      TEXT,
+    payload     TEXT NOT NULL,
+    PRIMARY KEY (user_key, call_id)
+);
+CREATE INDEX IF NOT EXISTS calls_by_time ON calls (user_key, start_ts);
+CREATE TABLE IF NOT EXISTS synced_days (
+    user_key TEXT NOT NULL,
+    day      TEXT NOT NULL,
+    PRIMARY KEY (user_key, day)
+);
+CREATE TABLE IF NOT EXISTS high_water (
+    user_key     TEXT PRIMARY KEY,
+    synced_until INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirty_days (
+    user_key TEXT NOT NULL,
+    day      TEXT NOT NULL,
+    PRIMARY KEY (user_key, day)
+);
+CREATE TABLE IF NOT EXISTS feed_state (
+    id         INTEGER PRIMARY KEY CHECK (id = 1),
+    live_since INTEGER,
+    seen_at    INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_marks (
+    user_key   TEXT PRIMARY KEY,
+    last_event INTEGER NOT NULL
+);
+"""
+
+# Bump when the layout changes; the store only mirrors upstream, so older files are rebuilt
+SCHEMA_VERSION = 2
+
+CALL_COLUMNS = ("user_key", "call_id", "start_ts", "duration_ms", "direction", "caller", "callee")
+
+
+def parse_ts(value):
+    # str / datetime / pandas Timestamp -> aware UTC datetime (naive values are UTC)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def to_ms(value):
+    return int(parse_ts(value).timestamp() * 1000)
+
+
+def from_ms(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def eastern_day(value):
+    return parse_ts(value).astimezone(EASTERN).date()
+
+
+def day_bounds(day):
+    # UTC [start, end) of an Eastern calendar day
+    start = datetime.combine(day, datetime.min.time(), EASTERN).astimezone(timezone.utc)
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time(), EASTERN).astimezone(timezone.utc)
+    return start, end
+
+
+def call_id(call):
+    cid = call.get("legId") or call.get("id") or call.get("callId")
+    if cid:
+        return str(cid)
+    caller = call.get("caller") if isinstance(call.get("caller"), dict) else {}
+    callee = call.get("callee") if isinstance(call.get("callee"), dict) else {}
+    return "|".join(str(x) for x in (
+        call.get("startTime"), call.get("direction"), caller.get("number"), callee.get("number")
+    ))
+
+
+def call_duration_ms(call):
+    duration = call.get("duration")
+    if duration is not None:
+        try:
+            return int(float(duration))
+        except (TypeError, ValueError):
+            pass
+    if call.get("endTime") and call.get("startTime"):
+        return max(0, to_ms(call["endTime"]) - to_ms(call["startTime"]))
+    return 0
+
+
+def _number(party):
+    return party.get("number") if isinstance(party, dict) else None
+
+
+class CallStore:
+    def __init__(self, path=CALL_STORE_PATH, lookback_minutes=STORE_OPEN_LOOKBACK_MINUTES,
+                 feed_stale_seconds=EVENTS_STALE_SECONDS):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lookback = timedelta(minutes=lookback_minutes)
+        self.feed_stale = timedelta(seconds=feed_stale_seconds)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            tables = [row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            for table in tables:
+                self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        # Serialized access for modules that keep derived tables in the same database (e.g. rollups)
+        with self._lock, self._conn:
+            yield self._conn
+
+    # --- Coverage
+    def missing_windows(self, user_key, start_time, end_time, now=None, max_days=None):
+        # Returns [(start, end, closed_days)] still to fetch; days that are fully
+        # in the past are fetched once, the open window only from the high-water mark.
+        # Adjacent days are merged into one window, up to max_days closed days each.
+        now = now or datetime.now(timezone.utc)
+        start, end = parse_ts(start_time), parse_ts(end_time)
+        with self._lock:
+            synced = {row[0] for row in self._conn.execute(
+                "SELECT day FROM synced_days WHERE user_key = ?", (user_key,)
+            )}
+            row = self._conn.execute(
+                "SELECT synced_until FROM high_water WHERE user_key = ?", (user_key,)
+            ).fetchone()
+        high_water = from_ms(row[0]) if row else None
+        live_since = self.live_since
+
+        windows = []
+        day = eastern_day(start)
+        while True:
+            d_start, d_end = day_bounds(day)
+            if d_start > end or d_start > now:
+                break
+            if d_end <= now - self.lookback:
+                if day.isoformat() not in synced:
+                    windows.append([d_start, d_end, [day.isoformat()]])
+            elif live_since and high_water and high_water >= live_since:
+                # Synced once since the feed went live; everything newer arrives as events
+                pass
+            else:
+                w_start = max(d_start, high_water - self.lookback) if high_water else d_start
+                windows.append([w_start, now, []])
+            day += timedelta(days=1)
+
+        merged = []
+        for window in windows:
+            if merged and merged[-1][1] >= window[0] and not (max_days and len(merged[-1][2]) >= max_days):
+                merged[-1][1] = max(merged[-1][1], window[1])
+                merged[-1][2].extend(window[2])
+            else:
+                merged.append(window)
+        return [tuple(w) for w in merged]
+
+    # --- Live event feed. Kept in the database, so every process sharing the file
+    # (dashboard, webhook service) sees the same state.
+    @property
+    def live_since(self):
+        # Set while a feed is appending calls (see api/events.py); a feed silent for
+        # feed_stale is treated as gone, even if its process died without clearing it
+        with self._lock:
+            row = self._conn.execute("SELECT live_since, seen_at FROM feed_state WHERE id = 1").fetchone()
+        if not row or row[0] is None or datetime.now(timezone.utc) - from_ms(row[1]) > self.feed_stale:
+            return None
+        return from_ms(row[0])
+
+    def set_live(self, since):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO feed_state (id, live_since, seen_at) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET live_since = excluded.live_since, seen_at = excluded.seen_at",
+                (to_ms(since) if since else None, to_ms(datetime.now(timezone.utc))),
+            )
+
+    def touch_feed(self):
+        # Heartbeat: the feed that set live_since is still delivering
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE feed_state SET seen_at = ? WHERE id = 1", (to_ms(datetime.now(timezone.utc)),))
+
+    def mark_events(self, user_keys, at=None):
+        at = to_ms(at or datetime.now(timezone.utc))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO event_marks (user_key, last_event) VALUES (?, ?) "
+                "ON CONFLICT(user_key) DO UPDATE SET last_event = MAX(last_event, excluded.last_event)",
+                [(user_key, at) for user_key in user_keys],
+            )
+
+    def event_mark(self, user_key):
+        # When events last added calls for this nurse (epoch ms, 0 if never); part of cache keys
+        with self._lock:
+            row = self._conn.execute("SELECT last_event FROM event_marks WHERE user_key = ?", (user_key,)).fetchone()
+        return row[0] if row else 0
+
+    def mark_synced(self, user_key, days, synced_until=None):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO synced_days (user_key, day) VALUES (?, ?)",
+                [(user_key, day) for day in days],
+            )
+            if synced_until is not None:
+                self._conn.execute(
+                    "INSERT INTO high_water (user_key, synced_until) VALUES (?, ?) "
+                    "ON CONFLICT(user_key) DO UPDATE SET synced_until = MAX(synced_until, excluded.synced_until)",
+                    (user_key, to_ms(synced_until)),
+                )
+
+    # --- Calls
+    def add_calls(self, user_key, calls, batch_size=500):
+        # Accepts any iterable (e.g. a streamed response) and writes it in bounded batches
+        added = 0
+        batch = []
+        for call in calls:
+            if not call.get("startTime"):
+                continue
+            local_start = parse_ts(call["startTime"]).astimezone(EASTERN)
+            batch.append((
+                user_key,
+                call_id(call),
+                local_start.date().isoformat(),
+                local_start.hour,
+                to_ms(call["startTime"]),
+                call_duration_ms(call),
+                call.get("direction"),
+                _number(call.get("caller")),
+                _number(call.get("callee")),
+                json.dumps(call, separators=(",", ":")),
+            ))
+            if len(batch) >= batch_size:
+                added += self._write_calls(batch)
+                batch = []
+        if batch:
+            added += self._write_calls(batch)
+        return added
+
+    def _write_calls(self, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO calls "
+                "(user_key, call_id, day, hour, start_ts, duration_ms, direction, caller, callee, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # Rollups for these days are rebuilt on next read
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO dirty_days (user_key, day) VALUES (?, ?)",
+                {(row[0], row[2]) for row in rows},
+            )
+        return len(rows)
+
+    def load_calls(self, user_key, start_time, end_time):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM calls WHERE user_key = ? AND start_ts BETWEEN ? AND ? ORDER BY start_ts",
+                (user_key, to_ms(start_time), to_ms(end_time)),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def load_call_rows(self, user_keys, start_time, end_time, missed_inbound_only=False):
+        # Typed columns only (see CALL_COLUMNS), no JSON decoding
+        user_keys = list(user_keys)
+        if not user_keys:
+            return []
+        sql = (
+            f"SELECT {', '.join(CALL_COLUMNS)} FROM calls "
+            f"WHERE user_key IN ({', '.join('?' * len(user_keys))}) AND start_ts BETWEEN ? AND ?"
+        )
+        if missed_inbound_only:
+            sql += " AND duration_ms = 0 AND direction = 'INBOUND'"
+        with self._lock:
+            return self._conn.execute(
+                sql + " ORDER BY start_ts", (*user_keys, to_ms(start_time), to_ms(end_time))
+            ).fetchall()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CallStore()
+        return _store
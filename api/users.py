@@ -1,13 +1,264 @@
 # api/users.py
-import requests
-from config import ACCESS_TOKEN, ACCOUNT_KEY, BASE_URL
+# One user directory per process, shared by the dashboard, the prefetcher and the
+# webhook: every nurse resolves to the same label everywhere, in constant time.
+import threading
+import time
 
-# api/users.py
-def get_users():
-    url = f"{BASE_URL}/users/v1/users?accountKey={ACCOUNT_KEY}"
-    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json().get("items", [])  # <-- this line is critical
+import config
+from config import CACHE_TTL_USERS, USERS_PAGE_SIZE, USERS_PREFIX_CHARS
+from api import client
+from utils import metrics
+
+
+def normalize(text):
+    return " ".join(str(text).casefold().split())
+
+
+def base_label(user):
+    lines = user.get("lines") or [{}]
+    return lines[0].get("name") or user.get("name") or user.get("email") or f"User {user['userKey'][:6]}"
+
+
+def _names(user, label):
+    # Everything a caller may type to mean this user
+    lines = user.get("lines") or [{}]
+    values = (label, lines[0].get("name"), user.get("name"), user.get("email"), user["userKey"])
+    return {normalize(v) for v in values if v}
+
+
+def _words(names):
+    # Whole names plus each word, with emails split at "@" and "."
+    return {w for name in names for w in name.replace("@", " ").replace(".", " ").split()} | set(names)
+
+
+def _prefixes(names):
+    # The first 1..USERS_PREFIX_CHARS characters of every word
+    return {w[:n] for w in _words(names) for n in range(1, min(len(w), USERS_PREFIX_CHARS) + 1)}
+
+
+def fetch_users(validators=None):
+    """All users, following nextPageMarker. Returns (items, validators), or
+    (None, validators) when the server answers 304 to our ETag/Last-Modified."""
+    url = f"{config.BASE_URL}/users/v1/users"
+    params = {"accountKey": config.ACCOUNT_KEY, "pageSize": USERS_PAGE_SIZE}
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    items, marker = [], None
+    while True:
+        page_params = {**params, "pageMarker": marker} if marker else params
+        response = client.get(url, params=page_params, headers=headers, authenticated=True)
+        if response.status_code == 304:
+            return None, validators
+        response.raise_for_status()
+        if marker is None:
+            validators = {"etag": response.headers.get("ETag"),
+                          "last_modified": response.headers.get("Last-Modified")}
+            headers = {}   # validators apply to the first page only
+        doc = response.json()
+        items.extend(doc.get("items", []))  # <-- this line is critical
+        marker = doc.get("nextPageMarker")
+        if not marker:
+            return items, validators
+
+
+class UserDirectory:
+    """Users indexed by key, display label, normalized name/email and word prefix.
+
+    Refreshed at most every `ttl` seconds on access. The upstream list is
+    revalidated with ETag/If-Modified-Since; when the server has no validators,
+    a diff against the current users decides which index entries change.
+    Only the first load (and refresh(force=True)) waits on the API; after that a
+    stale directory keeps serving its snapshot while one background thread
+    revalidates and swaps in the new index. Labels are unique; nurses sharing a
+    name get their email (or key) appended.
+    """
+
+    def __init__(self, ttl=CACHE_TTL_USERS):
+        self.ttl = ttl
+        self.checked_at = None
+        self.version = 0
+        self._loaded = False
+        self._validators = None
+        self._index = _empty_index()
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        if not force and self._fresh():
+            return self
+        if force or not self._loaded:
+            with self._lock:
+                if force or not self._fresh():
+                    self._fetch()
+            return self
+        # Stale: whoever wins the lock revalidates in the background; nobody waits
+        if self._lock.acquire(blocking=False):
+            try:
+                threading.Thread(target=self._background_fetch, name="user-directory", daemon=True).start()
+            except Exception:
+                self._lock.release()
+                raise
+        return self
+
+    def invalidate(self):
+        # Next access revalidates upstream (cheap when the server honours ETags)
+        self.checked_at = None
 
+    def _background_fetch(self):
+        try:
+            if not self._fresh():
+                self._fetch()
+        finally:
+            self._lock.release()
 
+    def _fetch(self):
+        # Caller holds self._lock
+        try:
+            items, self._validators = fetch_users(self._validators)
+        except Exception as e:
+            metrics.count("user_directory_refreshes_total", result="error")
+            if not self._loaded:
+                raise
+            print("👥 User directory refresh failed, serving the last good list:", e)
+            return   # retried on the next access
+        self.checked_at = time.monotonic()
+        self._loaded = True
+        if items is None or not self._apply(items):
+            metrics.count("user_directory_refreshes_total", result="unchanged")
+        else:
+            metrics.count("user_directory_refreshes_total", result="changed")
+
+    def _fresh(self):
+        return self.checked_at is not None and time.monotonic() - self.checked_at < self.ttl
+
+    def _apply(self, items):
+        old = self._index
+        users = {u["userKey"]: u for u in items}
+        changed = {k for k, u in users.items() if old["users"].get(k) != u}
+        removed = set(old["users"]) - set(users)
+        if not changed and not removed and list(users) == list(old["users"]):
+            return False
+
+        index = {
+            "users": users,
+            "base": {k: old["base"][k] for k in users if k not in changed},
+            "names": dict(old["names"]),
+            "name_keys": {k: old["name_keys"][k] for k in users if k not in changed},
+            "prefix": dict(old["prefix"]),
+            "prefix_keys": {k: old["prefix_keys"][k] for k in users if k not in changed},
+            "base_count": dict(old["base_count"]),
+        }
+        touched = set()
+        for key in changed | removed:
+            if key in old["base"]:
+                index["base_count"][old["base"][key]] -= 1
+            touched |= old["name_keys"].get(key, set())
+            for prefix in old["prefix_keys"].get(key, ()):
+                bucket = index["prefix"][prefix] = index["prefix"][prefix] - {key}
+                if not bucket:
+                    del index["prefix"][prefix]
+        for key in changed:
+            label = index["base"][key] = base_label(users[key])
+            index["base_count"][label] = index["base_count"].get(label, 0) + 1
+            names = index["name_keys"][key] = _names(users[key], label)
+            touched |= names
+            index["prefix_keys"][key] = _prefixes(names)
+            for prefix in index["prefix_keys"][key]:
+                index["prefix"][prefix] = index["prefix"].get(prefix, frozenset()) | {key}
+        index["order"] = {key: i for i, key in enumerate(users)}
+        # A shared name belongs to its first holder in directory order, exactly as a full
+        # rebuild would assign it, so every process resolves it the same way
+        kept = [k for k in old["users"] if k in users and k not in changed]
+        if kept != [k for k in users if k in old["users"] and k not in changed]:
+            index["names"] = {}
+            for key in users:
+                for name in index["name_keys"][key]:
+                    index["names"].setdefault(name, key)
+        else:
+            for name in touched:
+                holders = [k for k in index["prefix"].get(name[:USERS_PREFIX_CHARS], ())
+                           if name in index["name_keys"][k]]
+                if holders:
+                    index["names"][name] = min(holders, key=index["order"].get)
+                else:
+                    index["names"].pop(name, None)
+
+        # Display labels, unique per user
+        index["labels"] = {}
+        for key in users:
+            label = index["base"][key]
+            if index["base_count"][label] > 1:
+                label = f"{label} ({users[key].get('email') or key[:6]})"
+            index["labels"][key] = label
+        index["by_label"] = {normalize(label): key for key, label in index["labels"].items()}
+
+        self._index = index
+        self.version += 1
+        return True
+
+    # --- Lookups (each refreshes first when the directory is stale)
+    def users(self):
+        return list(self.refresh()._index["users"].values())
+
+    def labels(self):
+        # {userKey: label} in directory order
+        return dict(self.refresh()._index["labels"])
+
+    def label(self, user_key):
+        return self.refresh()._index["labels"].get(user_key)
+
+    def known_label(self, user_key):
+        # No refresh: for background paths (e.g. alerts) that must not wait on the API
+        return self._index["labels"].get(user_key)
+
+    def options(self):
+        # Labels of users with a phone line, for pickers
+        index = self.refresh()._index
+        return [index["labels"][k] for k, u in index["users"].items() if u.get("lines")]
+
+    def search(self, text, limit=20):
+        """Keys whose label, name or email has a word starting with `text`, in directory order."""
+        needle = normalize(text)
+        if not needle:
+            return []
+        index = self.refresh()._index
+        keys = index["prefix"].get(needle[:USERS_PREFIX_CHARS], ())
+        if len(needle) > USERS_PREFIX_CHARS:
+            keys = [k for k in keys if any(w.startswith(needle) for w in _words(index["name_keys"][k]))]
+        return sorted(keys, key=index["order"].get)[:limit]
+
+    def key_for(self, text):
+        """userKey for an exact label, a name/email/key (any case), or else the first prefix match."""
+        if not text:
+            return None
+        index = self.refresh()._index
+        needle = normalize(text)
+        key = index["by_label"].get(needle) or index["names"].get(needle)
+        if key is None:
+            matches = self.search(text, limit=1)
+            key = matches[0] if matches else None
+        return key
+
+
+def _empty_index():
+    return {"users": {}, "base": {}, "names": {}, "name_keys": {}, "prefix": {}, "prefix_keys": {},
+            "base_count": {}, "labels": {}, "by_label": {}, "order": {}}
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_directory():
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            _directory = UserDirectory()
+        return _directory
+
+
+def get_users():
+    return get_directory().users()
@@ -1,39 +1,232 @@
-import streamlit as st
+# api/webhook.py
+# Standalone summary service for external systems:  python -m api.webhook [--port 8502]
+# Imports no Streamlit; configure through GOTO_* environment variables.
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import pytz
-import pandas as pd
-from api.calls import get_user_calls
-from api.users import get_users
+from urllib.parse import parse_qs, unquote, urlsplit
 
-def serve_data_for_webhook(user_name, start, end):
-    users = get_users()
-    user_key = None
-    for u in users:
-        if user_name.lower() in str(u).lower():
-            user_key = u["userKey"]
-            break
+from config import CACHE_TTL_CALLS, WEBHOOK_HOST, WEBHOOK_MAX_UPSTREAM, WEBHOOK_PORT
+from api.cache import get_cache
+from api.calls import sync_user_calls
+from api.events import get_ingestor
+from api.singleflight import SingleFlight
+from api.store import day_bounds, get_store
+from api.users import get_directory
+from utils import metrics
+from logic.alerts import attach_alerts
+from logic.rollups import sum_daily_rollups
 
-    if not user_key:
-        return {"error": "User not found"}
-
-    shift_start = datetime.strptime(start, "%Y-%m-%d")
-    shift_end = datetime.strptime(end, "%Y-%m-%d")
-    shift_start_str = shift_start.strftime("%Y-%m-%dT00:00:00Z")
-    shift_end_str = shift_end.strftime("%Y-%m-%dT23:59:59Z")
-
-    calls = get_user_calls(user_key, shift_start_str, shift_end_str)
-    df = pd.DataFrame(calls)
-    df["duration"] = pd.to_numeric(df.get("duration", 0), errors="coerce") / 60000
-    df["duration"] = df["duration"].fillna(0)
-
-    answered = df[df["duration"] > 0]
-    missed = df[df["duration"] == 0]
-
-    return {
-        "user": user_name,
-        "total_calls": len(df),
-        "answered_calls": len(answered),
-        "missed_calls": len(missed),
-        "avg_duration": round(answered["duration"].mean() or 0, 2),
-        "total_duration": round(answered["duration"].sum(), 2)
+MAX_BATCH = 200
+MAX_BODY = 1024 * 1024
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 502: "Bad Gateway"}
+
+summary_cache = get_cache("summaries", CACHE_TTL_CALLS)
+summary_flights = SingleFlight()
+
+def find_user_key(user_name):
+    # Exact label/name/email first, then a word prefix ("smi" -> "Jane Smith")
+    return get_directory().key_for(user_name)
+
+
+def summarize(user_key, start_date, end_date):
+    # The event mark retires cached summaries as soon as an event adds calls for this nurse
+    key = (user_key, start_date.isoformat(), end_date.isoformat(), get_store().event_mark(user_key))
+    summary = summary_cache.get(key)
+    if summary is None:
+        # Identical concurrent requests (e.g. a batch naming a nurse twice) build it once
+        summary = summary_flights.do(key, _build_summary, key, user_key, start_date, end_date)
+    return summary
+
+
+def _build_summary(key, user_key, start_date, end_date):
+    summary = summary_cache.get(key)
+    if summary is not None:
+        return summary
+
+    range_start, _ = day_bounds(start_date)
+    _, range_end = day_bounds(end_date)
+    sync_user_calls(user_key, range_start, range_end - timedelta(seconds=1))
+    totals = sum_daily_rollups([user_key], start_date, end_date)
+
+    answered = totals["answered_calls"]
+    talk_minutes = totals["talk_time_ms"] / 60000
+    summary = {
+        "total_calls": totals["total_calls"],
+        "answered_calls": answered,
+        "missed_calls": totals["missed_calls"],
+        "avg_duration": round(talk_minutes / answered, 2) if answered else 0,
+        "total_duration": round(float(talk_minutes), 2),
     }
+    summary_cache.set(key, summary)
+    return summary
+
+
+def serve_data_for_webhook(user_name, start, end):
+    # Dates are Eastern calendar days (YYYY-MM-DD), matching the dashboard
+    user_key = find_user_key(user_name)
+    if not user_key:
+        return {"user": user_name, "error": "User not found"}
+    start_date = datetime.strptime(start, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end, "%Y-%m-%d").date()
+    return {"user": user_name, **summarize(user_key, start_date, end_date)}
+
+
+# --- Async HTTP service
+class WebhookService:
+    def __init__(self, max_upstream=WEBHOOK_MAX_UPSTREAM):
+        self._executor = ThreadPoolExecutor(max_workers=max_upstream, thread_name_prefix="webhook")
+        self._upstream = asyncio.Semaphore(max_upstream)
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("GET", "/summary"): self.summary,
+            ("POST", "/summary/batch"): self.batch_summary,
+            ("POST", "/events"): self.events,
+            ("GET", "/alerts"): self.alerts,
+        }
+        self.alert_engine = None
+
+    def _ingestor(self):
+        # The service is where live alerts get wired into ingestion; api.events knows nothing of logic
+        ingestor = get_ingestor()
+        if self.alert_engine is None:
+            self.alert_engine = attach_alerts(ingestor)
+        return ingestor
+
+    async def _call(self, fn, *args):
+        # Blocking work (API, SQLite) runs in the pool; the semaphore bounds upstream concurrency
+        async with self._upstream:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _one(self, name, start, end):
+        # Never raises: in a batch, one nurse's failure must not take down the others
+        try:
+            return await self._call(serve_data_for_webhook, name, start, end)
+        except ValueError as e:
+            return {"user": name, "error": str(e)}
+        except Exception as e:
+            return {"user": name, "error": f"Upstream failure: {e}"}
+
+    async def health(self, query, body):
+        return 200, {"status": "ok"}
+
+    async def metrics(self, query, body):
+        # Prometheus text exposition; a str result is sent as text/plain
+        return 200, metrics.registry.prometheus()
+
+    async def summary(self, query, body):
+        name, start, end = (query.get(k, [None])[0] for k in ("nurse", "start", "end"))
+        if not (name and start and end):
+            return 400, {"error": "nurse, start and end are required"}
+        result = await self._one(name, start, end)
+        error = result.get("error")
+        if error is None:
+            return 200, result
+        return (404 if error == "User not found" else 502 if error.startswith("Upstream failure") else 400), result
+
+    async def batch_summary(self, query, body):
+        try:
+            payload = json.loads(body or b"{}")
+            nurses, start, end = payload["nurses"], payload["start"], payload["end"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": 'expected {"nurses": [...], "start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}'}
+        if not isinstance(nurses, list) or len(nurses) > MAX_BATCH:
+            return 400, {"error": f"nurses must be a list of at most {MAX_BATCH} names"}
+        results = await asyncio.gather(*(self._one(str(n), start, end) for n in nurses))
+        return 200, {"results": results}
+
+    async def events(self, query, body):
+        # Receiver for call-history / call-event notifications (a single event or a list)
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError:
+            return 400, {"error": "expected a JSON event or list of events"}
+        events = payload if isinstance(payload, list) else [payload]
+        ingestor = self._ingestor()
+        for event in events:
+            ingestor.submit(event)
+        return 202, {"accepted": len(events)}
+
+    async def alerts(self, query, body):
+        # Most recent alerts raised from ingested events, newest last
+        self._ingestor()
+        return 200, {"alerts": self.alert_engine.delivered}
+
+    async def dispatch(self, method, target, body):
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/") or "/"
+        query = parse_qs(parts.query)
+        # /nurses/<name>/summary is an alias for /summary?nurse=<name>
+        segments = path.split("/")
+        if method == "GET" and len(segments) == 4 and segments[1] == "nurses" and segments[3] == "summary":
+            query["nurse"] = [unquote(segments[2])]
+            path = "/summary"
+        handler = self.routes.get((method, path))
+        if handler is None:
+            return 404, {"error": "Not found"}
+        try:
+            return await handler(query, body)
+        except Exception as e:
+            return 502, {"error": f"Upstream failure: {e}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    status, result = 413, {"error": "Request body too large"}
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    started = time.perf_counter()
+                    status, result = await self.dispatch(method.upper(), target, body)
+                    metrics.observe("webhook_request_seconds", time.perf_counter() - started, method=method.upper())
+                    metrics.count("webhook_requests_total", method=method.upper(), status=status)
+
+                if isinstance(result, str):
+                    payload, content_type = result.encode(), "text/plain; version=0.0.4"
+                else:
+                    payload, content_type = json.dumps(result).encode(), "application/json"
+                # An unread oversized body leaves the stream unusable, so that connection is closed
+                keep_alive = headers.get("connection", "").lower() != "close" and status != 413
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=WEBHOOK_HOST, port=WEBHOOK_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🔌 Webhook service listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nurse call summary webhook service")
+    parser.add_argument("--host", default=WEBHOOK_HOST)
+    parser.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    args = parser.parse_args()
+    asyncio.run(WebhookService().serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import streamlit as st
 from datetime import datetime, timedelta
-import pytz
 
 from logic.overall import render_overall_view
 from logic.userwise import render_userwise_view
-from api.users import get_users
+from logic.admin import render_admin_panel
+from logic.rollups import refresh_rollups
+from api.prefetch import get_prefetcher
+from api.users import get_directory
+from utils.ranges import PRESETS, preset_range
 
 # --- Streamlit Config ---
 st.set_page_config("GoTo Call Dashboard", layout="wide")
@@ -18,6 +21,9 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# --- Background warm-up of the presets (one per process), ranked by what people open
+prefetcher = get_prefetcher(on_synced=[refresh_rollups])
+
 # --- Auth ---
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
@@ -45,36 +51,28 @@ if not st.session_state.authenticated:
 st.sidebar.header("Filters")
 
 today = datetime.today().date()
-range_option = st.sidebar.selectbox("Date Range", ["Day", "Week", "Month", "Custom"])
+range_option = st.sidebar.selectbox("Date Range", [*PRESETS, "Custom"])
 
-if range_option == "Day":
-    start = end = today
-elif range_option == "Week":
-    start = today - timedelta(days=7)
-    end = today
-elif range_option == "Month":
-    start = today.replace(day=1)
-    end = today
+if range_option in PRESETS:
+    start, end = preset_range(range_option, today)
 else:
     start = st.sidebar.date_input("Start Date", today - timedelta(days=7))
     end = st.sidebar.date_input("End Date", today)
 
 # --- User Dropdown (includes All Nurses)
-users = get_users()
-user_options = ["All Nurses"] + [
-    u.get("lines", [{}])[0].get("name") or u.get("name") or f"User {u['userKey'][:6]}"
-    for u in users if u.get("lines") and len(u["lines"]) > 0
-]
+directory = get_directory()
+user_options = ["All Nurses"] + directory.options()
 selected_user = st.sidebar.selectbox("Select Nurse", user_options)
 
 # --- Routing Logic ---
 if selected_user == "All Nurses":
+    prefetcher.record_use(range_option)
     render_overall_view(start, end)
 else:
-    # Find user_key for selected user
-    user_map = {
-        (u.get("lines", [{}])[0].get("name") or u.get("name") or f"User {u['userKey'][:6]}"): u["userKey"]
-        for u in users if u.get("lines") and len(u["lines"]) > 0
-    }
-    user_key = user_map.get(selected_user)
+    user_key = directory.key_for(selected_user)
+    prefetcher.record_use(range_option, user_key)
     render_userwise_view(user_key, start, end)
+
+# --- Hidden instrumentation panel (?admin=1)
+if st.query_params.get("admin") == "1":
+    render_admin_panel()
@@ -0,0 +1,79 @@
+# bench/import_budget.py
+# Guards cold-start cost of the headless entry points:  python -m bench.import_budget
+# Each module is imported in a fresh interpreter with no GOTO_* settings, so an
+# import that reads credentials, or pulls in a heavy dependency, fails the check.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY = ("streamlit", "plotly", "pandas", "numpy")
+
+# module -> (max seconds, heavy modules it may import)
+BUDGETS = {
+    "config": (0.05, ()),
+    "api.store": (0.15, ()),
+    "api.users": (0.4, ()),
+    "api.calls": (0.4, ()),
+    "api.events": (0.4, ()),
+    "api.webhook": (0.5, ()),
+    "logic.rollups": (0.4, ()),
+    "logic.alerts": (0.4, ()),
+    "logic.gaps": (1.5, ("pandas", "numpy")),
+    "logic.flagging": (1.5, ("pandas", "numpy")),
+}
+
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def probe(module, root):
+    env = {k: v for k, v in os.environ.items() if not k.startswith("GOTO_")}
+    env["PYTHONPATH"] = root
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+        cwd=root, env=env, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        return {"error": out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "import failed"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time and heavy dependencies of headless modules")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply time budgets (slow machines / CI)")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N imports per module")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    failures = 0
+    print(f"{'module':<16} {'seconds':>8} {'budget':>8} {'rss_mb':>7}  heavy imports")
+    for module, (budget, allowed) in BUDGETS.items():
+        runs = [probe(module, root) for _ in range(args.repeat)]
+        errors = [r["error"] for r in runs if "error" in r]
+        if errors:
+            failures += 1
+            print(f"{module:<16} ❌ {errors[0]}")
+            continue
+        best = min(runs, key=lambda r: r["seconds"])
+        unexpected = [m for m in best["heavy"] if m not in allowed]
+        over = best["seconds"] > budget * args.scale
+        failures += bool(unexpected or over)
+        mark = "❌" if unexpected or over else "✅"
+        print(f"{module:<16} {best['seconds']:>8.3f} {budget * args.scale:>8.2f} {best['max_rss_mb']:>7.1f}  "
+              f"{', '.join(best['heavy']) or '-'} {mark}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# bench/mockapi.py
+# Local stand-in for the GoTo endpoints the dashboard uses:
+#   GET /users/v1/users              (paginated when pageSize is given; ETag / If-None-Match)
+#   GET /call-history/v1/calls       (startTime/endTime filter, pageSize + pageMarker)
+#   POST /_alerts                    (receives alerts from the "http" sink; see GET /_stats)
+# with configurable latency and a share of 429 responses.
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench.synthetic import generate_calls, generate_users
+
+MAX_PAGE_SIZE = 100
+
+
+def _ts(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class MockGoTo:
+    def __init__(self, nurses=10, calls_per_day=40, latency=0.0, throttle=0.0, seed=0,
+                 host="127.0.0.1", port=0):
+        self.users = generate_users(nurses)
+        self.users_etag = f'"{zlib.crc32(json.dumps(self.users).encode()):08x}"'
+        self.calls_per_day = calls_per_day
+        self.latency = latency
+        self.throttle = throttle
+        self.seed = seed
+        self.stats = {"requests": 0, "throttled": 0, "bytes": 0, "alerts": 0}
+        self.alerts = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-goto", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- Responses
+    def _page(self, items, query):
+        size = min(int(query.get("pageSize", [MAX_PAGE_SIZE])[0]), MAX_PAGE_SIZE)
+        offset = int(query.get("pageMarker", [0])[0])
+        doc = {"items": items[offset:offset + size]}
+        if offset + size < len(items):
+            doc["nextPageMarker"] = str(offset + size)
+        return doc
+
+    def respond(self, path, query):
+        if path == "/_stats":
+            return 200, dict(self.stats)
+        if path == "/users/v1/users":
+            if "pageSize" not in query:
+                return 200, {"items": self.users}
+            return 200, self._page(self.users, query)
+        if path == "/call-history/v1/calls":
+            try:
+                user_key = query["userKey"][0]
+                start, end = _ts(query["startTime"][0]), _ts(query["endTime"][0])
+            except (KeyError, ValueError):
+                return 400, {"error": "userKey, startTime and endTime are required"}
+            # Regenerated per page; deterministic, so markers stay valid across requests
+            items = list(generate_calls(user_key, start, end, self.calls_per_day, self.seed))
+            return 200, self._page(items, query)
+        return 404, {"error": "Not found"}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == "/_stats":
+                    return self._send(*mock.respond(parts.path, {}), {})
+                with mock._lock:
+                    mock.stats["requests"] += 1
+                    throttled = mock._rng.random() < mock.throttle
+                    if throttled:
+                        mock.stats["throttled"] += 1
+                if mock.latency:
+                    time.sleep(mock.latency)
+                if throttled:
+                    status, doc, headers = 429, {"error": "Too Many Requests"}, {"Retry-After": "0"}
+                elif parts.path == "/users/v1/users" and self.headers.get("If-None-Match") == mock.users_etag:
+                    status, doc, headers = 304, None, {"ETag": mock.users_etag}
+                else:
+                    status, doc = mock.respond(parts.path, parse_qs(parts.query))
+                    headers = {"ETag": mock.users_etag} if parts.path == "/users/v1/users" else {}
+                self._send(status, doc, headers)
+
+            def do_POST(self):
+                if urlsplit(self.path).path != "/_alerts":
+                    return self._send(404, {"error": "Not found"}, {})
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with mock._lock:
+                    mock.alerts.append(json.loads(body or b"null"))
+                    mock.stats["alerts"] += 1
+                self._send(200, {"ok": True}, {})
+
+            def _send(self, status, doc, headers):
+                body = json.dumps(doc).encode() if doc is not None else b""
+                with mock._lock:
+                    mock.stats["bytes"] += len(body)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def serve(nurses, calls_per_day=40, latency=0.0, throttle=0.0, port=8600, seed=0):
+    # Blocking; used as a subprocess target so the mock's CPU time stays out of measurements
+    mock = MockGoTo(nurses, calls_per_day, latency, throttle, seed=seed, port=port)
+    mock._server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a mock GoTo API for local testing")
+    parser.add_argument("--nurses", type=int, default=10)
+    parser.add_argument("--calls-per-day", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--throttle", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+    print(f"🧪 Mock GoTo API on http://127.0.0.1:{args.port} (set GOTO_BASE_URL to this)")
+    try:
+        serve(args.nurses, args.calls_per_day, args.latency, args.throttle, args.port)
+    except KeyboardInterrupt:
+        pass
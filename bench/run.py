@@ -0,0 +1,203 @@
+# bench/run.py
+# End-to-end benchmarks against the local mock API (bench/mockapi.py):
+#   python -m bench.run --nurses 10 100 500 --ranges Day Week Month
+# Streamlit views run in "bare" mode (no browser); widgets return their defaults.
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import requests
+
+from bench.mockapi import serve
+
+COLUMNS = ("nurses", "range", "calls", "fetch_s", "transform_s", "kernels_s",
+           "render_warm_s", "render_cold_s", "peak_mb", "requests", "throttled")
+
+
+def last_weekday(today=None):
+    # Most recent fully elapsed weekday, so every day in a preset is closed and repeatable
+    day = (today or date.today()) - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+class Phase:
+    """Wall time and tracemalloc peak of one block (peak is 0 when memory tracing is off)."""
+
+    def __init__(self, results, name):
+        self.results = results
+        self.name = name
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.results[f"{self.name}_s"] = round(time.perf_counter() - self.started, 3)
+        if tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            self.results["peak_mb"] = round(max(self.results.get("peak_mb", 0), peak), 1)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def mock_stats(base_url):
+    return requests.get(f"{base_url}/_stats", timeout=5).json()
+
+
+def wait_until_up(base_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return mock_stats(base_url)
+        except requests.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def run_scenario(base_url, nurses, preset, today, workdir):
+    # Imported late: config reads GOTO_* from the environment set up in main()
+    import api.store
+    import api.users
+    from api.cache import invalidate, all_stats
+    from api.calls import sync_calls_for_users
+    from api.users import get_users
+    from logic.flagging import process_call_data
+    from logic.gaps import team_gap_summary
+    from logic.overall import render_overall_view
+    from logic.rollups import load_daily_rollups, refresh_rollups
+    from logic.userwise import render_userwise_view
+    from utils.processing import analyze_calls, normalize_call_rows
+    from utils.ranges import eastern_bounds, preset_range
+
+    def reset():
+        for stats in all_stats():
+            invalidate(stats["name"])
+        api.users._directory = None   # a fresh directory loads synchronously, so the fetch is timed
+        path = os.path.join(workdir, f"store-{time.monotonic_ns()}.sqlite3")
+        api.store._store = api.store.CallStore(path)
+        return api.store._store
+
+    start_date, end_date = preset_range(preset, today)
+    start_str, end_str = eastern_bounds(start_date, end_date)
+    store = reset()
+    before = mock_stats(base_url)
+    results = {"nurses": nurses, "range": preset}
+
+    with Phase(results, "fetch"):
+        users = get_users()
+        keys = [u["userKey"] for u in users]
+        errors = [e for _, _, e in sync_calls_for_users(keys, start_str, end_str) if e is not None]
+    if errors:
+        results["errors"] = len(errors)
+
+    names = {u["userKey"]: u["name"] for u in users}
+    with Phase(results, "transform"):
+        refresh_rollups(store)
+        load_daily_rollups(keys, start_date, end_date)
+        frame = normalize_call_rows(store.load_call_rows(keys, start_str, end_str), names)
+        team_gap_summary(frame)
+    results["calls"] = len(frame)
+
+    with Phase(results, "kernels"):
+        raw = store.load_calls(keys[0], start_str, end_str)
+        analyze_calls(raw)
+        process_call_data(raw, None, None, 30)
+
+    with Phase(results, "render_warm"):
+        render_overall_view(start_date, end_date)
+        render_userwise_view(keys[0], start_date, end_date)
+
+    reset()
+    with Phase(results, "render_cold"):
+        render_overall_view(start_date, end_date)
+
+    after = mock_stats(base_url)
+    results["requests"] = after["requests"] - before["requests"]
+    results["throttled"] = after["throttled"] - before["throttled"]
+    return results
+
+
+def print_table(rows):
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in COLUMNS}
+    print("  ".join(c.rjust(widths[c]) for c in COLUMNS))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).rjust(widths[c]) for c in COLUMNS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fetch, transform and render against a mock GoTo API")
+    parser.add_argument("--nurses", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--ranges", nargs="+", default=["Day", "Week", "Month"], choices=["Day", "Week", "Month"])
+    parser.add_argument("--calls-per-day", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every mock response")
+    parser.add_argument("--throttle", type=float, default=0.01, help="share of mock responses that are 429")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="client request starts per second (0 = unlimited; production uses FETCH_RATE_LIMIT)")
+    parser.add_argument("--today", type=date.fromisoformat, default=None,
+                        help="reference day for the presets (default: last full weekday)")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (faster, no peak_mb)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    today = args.today or last_weekday()
+    workdir = tempfile.mkdtemp(prefix="nurse-bench-")
+    rows = []
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    os.environ.update(GOTO_BASE_URL=base_url, GOTO_ACCESS_TOKEN="bench", GOTO_ACCOUNT_KEY="bench")
+    from api.concurrency import rate_limiter
+    rate_limiter.rate = args.rate_limit
+    rate_limiter.burst = max(1.0, args.rate_limit)
+    import streamlit  # noqa: F401  (its loggers exist only once imported)
+    # Bare-mode noise; disabled rather than levelled, since streamlit resets levels when its config loads
+    for name in ("streamlit.runtime.scriptrunner_utils.script_run_context", "streamlit.deprecation_util"):
+        logging.getLogger(name).disabled = True
+
+    if not args.no_memory:
+        tracemalloc.start()
+    try:
+        for nurses in args.nurses:
+            # The mock runs in its own process so its CPU time and allocations are not measured
+            server = multiprocessing.Process(
+                target=serve, args=(nurses, args.calls_per_day, args.latency, args.throttle, port), daemon=True
+            )
+            server.start()
+            try:
+                wait_until_up(base_url)
+                for preset in args.ranges:
+                    print(f"⏱️ {nurses} nurses, {preset}...", flush=True)
+                    rows.append(run_scenario(base_url, nurses, preset, today, workdir))
+            finally:
+                server.terminate()
+                server.join()
+    finally:
+        tracemalloc.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"today": today.isoformat(), "args": {k: v for k, v in vars(args).items() if k != "today"},
+                       "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench/synthetic.py
+# Deterministic synthetic users and call-history items shaped like GoTo responses.
+import random
+import zlib
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+EASTERN = ZoneInfo("US/Eastern")
+
+
+def generate_users(count):
+    return [
+        {
+            "userKey": f"bench-{i:04d}",
+            "name": f"Nurse {i:04d}",
+            "email": f"nurse{i:04d}@example.org",
+            "lines": [{"name": f"Nurse {i:04d}"}],
+        }
+        for i in range(count)
+    ]
+
+
+def generate_day(user_key, day, calls_per_day, seed=0):
+    """One nurse's calls for one Eastern day, sorted by start time.
+
+    Weekdays only, between 08:00 and 18:00 Eastern. Roughly 20% are missed
+    (duration 0) and 60% are inbound. The same arguments always produce the
+    same calls, so a server can regenerate any page on demand.
+    """
+    if day.weekday() >= 5 or calls_per_day <= 0:
+        return []
+    rng = random.Random(f"{seed}:{user_key}:{day.isoformat()}")
+    opening = datetime.combine(day, datetime.min.time(), EASTERN) + timedelta(hours=8)
+    offsets = sorted(rng.uniform(0, 10 * 3600) for _ in range(calls_per_day))
+    calls = []
+    for i, offset in enumerate(offsets):
+        start = (opening + timedelta(seconds=offset)).astimezone(timezone.utc)
+        inbound = rng.random() < 0.6
+        duration = 0 if rng.random() < 0.2 else int(rng.expovariate(1 / 240_000))
+        patient = f"+1555{rng.randrange(10**7):07d}"
+        nurse = f"+1800{zlib.crc32(user_key.encode()) % 10**7:07d}"
+        calls.append({
+            "legId": f"{user_key}-{day.isoformat()}-{i}",
+            "startTime": start.isoformat().replace("+00:00", "Z"),
+            "duration": duration,
+            "direction": "INBOUND" if inbound else "OUTBOUND",
+            "caller": {"number": patient if inbound else nurse},
+            "callee": {"number": nurse if inbound else patient},
+        })
+    return calls
+
+
+def generate_calls(user_key, start, end, calls_per_day, seed=0):
+    # Every generated call with start <= startTime < end (both aware datetimes)
+    day = start.astimezone(EASTERN).date()
+    last = end.astimezone(EASTERN).date()
+    while day <= last:
+        for call in generate_day(user_key, day, calls_per_day, seed):
+            if start <= datetime.fromisoformat(call["startTime"].replace("Z", "+00:00")) < end:
+                yield call
+        day += timedelta(days=1)
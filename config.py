@@ -1,6 +1,146 @@
-import streamlit as st
+import json
+import os
 
-ACCESS_TOKEN = st.secrets["goto"]["GOTO_ACCESS_TOKEN"]
-ACCOUNT_KEY = st.secrets["goto"]["GOTO_ACCOUNT_KEY"]
-BASE_URL = st.secrets["goto"]["GOTO_BASE_URL"]
+# --- GoTo credentials: read on first use, not at import, from a pluggable source.
+# GOTO_CONFIG_SOURCE picks one of SOURCES; by default the environment is used when
+# GOTO_BASE_URL is set, then GOTO_CONFIG_FILE (TOML or JSON with a [goto] section),
+# then Streamlit secrets. Headless services therefore never import Streamlit.
+_SETTINGS = {
+    "ACCESS_TOKEN": "GOTO_ACCESS_TOKEN",
+    "ACCOUNT_KEY": "GOTO_ACCOUNT_KEY",
+    "BASE_URL": "GOTO_BASE_URL",
+    # OAuth refresh (optional; without these the static ACCESS_TOKEN is used as-is)
+    "CLIENT_ID": "GOTO_CLIENT_ID",
+    "CLIENT_SECRET": "GOTO_CLIENT_SECRET",
+    "REFRESH_TOKEN": "GOTO_REFRESH_TOKEN",
+}
+_OPTIONAL = {"CLIENT_ID", "CLIENT_SECRET", "REFRESH_TOKEN"}
 
+
+def _from_env():
+    return os.environ
+
+
+def _from_file(path=None):
+    path = path or os.environ["GOTO_CONFIG_FILE"]
+    with open(path, "rb") as f:
+        if path.endswith(".toml"):
+            import tomllib
+            data = tomllib.load(f)
+        else:
+            data = json.load(f)
+    return data.get("goto", data)
+
+
+def _from_streamlit():
+    import streamlit as st
+    return st.secrets["goto"]
+
+
+SOURCES = {"env": _from_env, "file": _from_file, "streamlit": _from_streamlit}
+_source = None
+_settings = None
+
+
+def use_source(source):
+    """Plugs in where credentials come from: a SOURCES name, a mapping, or a
+    callable returning one. Takes effect on the next credential lookup."""
+    global _source, _settings
+    _source, _settings = source, None
+
+
+def _load_settings():
+    global _settings
+    if _settings is None:
+        source = _source or os.getenv("GOTO_CONFIG_SOURCE")
+        if source is None:
+            source = "env" if os.getenv("GOTO_BASE_URL") else "file" if os.getenv("GOTO_CONFIG_FILE") else "streamlit"
+        if isinstance(source, str):
+            source = SOURCES[source]
+        _settings = source() if callable(source) else source
+    return _settings
+
+
+def __getattr__(name):
+    # Module-level lazy attributes (PEP 562): config.BASE_URL etc. resolve on first access
+    if name not in _SETTINGS:
+        raise AttributeError(f"module 'config' has no attribute {name!r}")
+    key = _SETTINGS[name]
+    value = _load_settings().get(key)
+    if name in _OPTIONAL:
+        return value or os.getenv(key)
+    if value is None:
+        raise KeyError(f"{key} is not configured")
+    return value
+
+
+# --- OAuth refresh
+TOKEN_REFRESH_MARGIN = 300  # seconds before expiry to refresh in the background
+
+# --- Fetch tuning
+FETCH_MAX_WORKERS = 8      # max concurrent upstream requests, process-wide; also the connection pool size
+FETCH_RATE_LIMIT = 10      # request starts per second, per host
+
+# --- Local call-history store
+CALL_STORE_PATH = "data/call_store.sqlite3"
+STORE_OPEN_LOOKBACK_MINUTES = 120   # calls newer than this may still be landing upstream
+SYNC_CHUNK_DAYS = 7         # long ranges are fetched as Eastern-day chunks of at most this many days
+SYNC_CHUNK_WORKERS = 4      # chunks fetched in parallel per nurse (still under FETCH_MAX_WORKERS and the rate limit)
+
+# --- Shared API cache (per process, shared by all sessions)
+CACHE_TTL_USERS = 600       # seconds between user-directory revalidations; the list rarely changes
+CACHE_TTL_CALLS = 60        # seconds; bounds staleness of the open "today" window
+CACHE_MAX_ENTRIES = 512
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_ITEM_BYTES = 2048     # estimated in-memory size of one cached list item (a call record is ~1.8 KB)
+
+# --- User directory
+USERS_PAGE_SIZE = 100       # users per page when listing the account
+USERS_PREFIX_CHARS = 4      # search prefixes indexed per word; longer input is filtered within that bucket
+
+# --- HTTP client
+HTTP_TIMEOUT = (5, 30)      # (connect, read) seconds
+HTTP_MAX_RETRIES = 4        # on 429 / 5xx / connection errors; POSTs only on 429 and connect failures
+HTTP_BACKOFF_BASE = 0.5     # seconds, doubled per attempt
+HTTP_BACKOFF_MAX = 15       # seconds
+
+# --- Rollups
+ROLLUP_GAP_MINUTES = 30     # idle gaps longer than this are counted per nurse-day
+
+# --- Batch benchmarking reports (python -m logic.reports)
+REPORT_DIR = "data/reports"
+REPORT_WEEKS = 13            # default span: one quarter of full weeks
+REPORT_BASELINE_WEEKS = 4    # rolling baseline = mean of the previous N weeks (inactive weeks skipped)
+REPORT_WORKERS = None        # report processes; None = one per CPU
+REPORT_CHUNK_NURSES = 20     # nurses per process-pool task
+REPORT_SHIFTS = {"Day": (7, 15), "Evening": (15, 23), "Night": (23, 7)}   # Eastern start hours, [first, last)
+
+# --- Webhook service
+WEBHOOK_HOST = "0.0.0.0"
+WEBHOOK_PORT = 8502
+WEBHOOK_MAX_UPSTREAM = 8    # concurrent summaries that may hit the GoTo API
+
+# --- Live call events
+EVENTS_BATCH_SIZE = 200      # events appended to the store per write
+EVENTS_STALE_SECONDS = 300   # a quiet feed is no longer trusted; views fall back to polling
+
+# --- Alerts on live call events (logic/alerts.py)
+ALERT_MISSED_PER_HOUR = 3          # missed inbound calls for one nurse within one Eastern clock hour
+ALERT_IDLE_MINUTES = 30            # idle gap between calls inside the clock window
+ALERT_CLOCK_WINDOW = ("09:00", "17:00")   # Eastern, weekdays; idle time outside it is not alerted
+ALERT_LOW_VOLUME_HOUR = 15         # from this Eastern hour, a team day still in the Low zone is alerted
+ALERT_COOLDOWN_SECONDS = 1800      # after an alert, the same rule stays quiet for that nurse this long
+ALERT_TICK_SECONDS = 60            # how often time-based checks (ongoing idle, low volume) run
+ALERT_SINKS = ("log", "file")      # any of "log", "file", "http"
+ALERT_FILE = "data/alerts.jsonl"
+ALERT_WEBHOOK_URL = None           # POST target for the "http" sink, e.g. a Slack incoming webhook
+
+# --- Daily call volume zones (team calls per day), shared by the overall view and alerts
+VOLUME_ZONE_BINS = [-1, 30, 70, float("inf")]
+VOLUME_ZONE_LABELS = ["Low", "Moderate", "High"]
+
+# --- Charts
+CHART_MAX_BARS = 1500        # above this, timelines are binned server-side instead of one bar per call
+
+# --- Background prefetch of the Day/Week/Month presets
+PREFETCH_INTERVAL = 900      # seconds between warm-up runs; 0 disables the prefetcher
@@ -0,0 +1,63 @@
+# logic/admin.py
+# Hidden timing panel: open the dashboard with ?admin=1 (after logging in).
+import pandas as pd
+import streamlit as st
+
+from api.cache import all_stats
+from utils.metrics import registry
+
+
+def render_admin_panel():
+    st.markdown("---")
+    st.subheader("🛠️ Instrumentation")
+    snap = registry.snapshot()
+
+    # --- Where the time goes, per stage (this process, since start or last reset)
+    stages = [
+        {
+            "Stage": dict(labels).get("stage"),
+            "Calls": h["count"],
+            "Total (s)": round(h["sum"], 3),
+            "Avg (ms)": round(h["sum"] / h["count"] * 1000, 1) if h["count"] else 0,
+            "p50 ≤ (s)": h["p50"],
+            "p95 ≤ (s)": h["p95"],
+        }
+        for (name, labels), h in snap["histograms"].items()
+        if name == "stage_seconds"
+    ]
+    st.markdown("**Stage timings**")
+    if stages:
+        st.dataframe(pd.DataFrame(stages).sort_values("Total (s)", ascending=False), hide_index=True)
+    else:
+        st.write("No timings recorded yet.")
+
+    # --- Upstream API
+    upstream = [
+        {"Metric": name, **dict(labels), "Value": value}
+        for (name, labels), value in sorted(snap["counters"].items(), key=lambda item: str(item[0]))
+        if name.startswith(("upstream_", "token_", "call_records"))
+    ]
+    latency = [
+        {"Host": dict(labels).get("host"), "Method": dict(labels).get("method"), "Requests": h["count"],
+         "Avg (ms)": round(h["sum"] / h["count"] * 1000, 1) if h["count"] else 0, "p95 ≤ (s)": h["p95"]}
+        for (name, labels), h in snap["histograms"].items()
+        if name == "upstream_request_seconds"
+    ]
+    st.markdown("**Upstream requests**")
+    col1, col2 = st.columns(2)
+    if upstream:
+        col1.dataframe(pd.DataFrame(upstream), hide_index=True)
+    else:
+        col1.write("No upstream calls yet.")
+    if latency:
+        col2.dataframe(pd.DataFrame(latency), hide_index=True)
+
+    # --- Caches
+    st.markdown("**Caches**")
+    st.dataframe(pd.DataFrame(all_stats()), hide_index=True)
+
+    if st.toggle("Show Prometheus text", key="admin_prometheus"):
+        st.code(registry.prometheus(), language="text")
+    if st.button("Reset counters", key="admin_reset"):
+        registry.reset()
+        st.rerun()
@@ -0,0 +1,331 @@
+# logic/alerts.py
+# Threshold alerts evaluated as live call events arrive (api/events.py), not by
+# re-running views: each rule keeps a little per-nurse state, so the cost is
+# proportional to new calls. No pandas, so the webhook service stays light.
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from config import (
+    ALERT_CLOCK_WINDOW, ALERT_COOLDOWN_SECONDS, ALERT_FILE, ALERT_IDLE_MINUTES, ALERT_LOW_VOLUME_HOUR,
+    ALERT_MISSED_PER_HOUR, ALERT_SINKS, ALERT_TICK_SECONDS, ALERT_WEBHOOK_URL, VOLUME_ZONE_BINS,
+    VOLUME_ZONE_LABELS,
+)
+from api.store import EASTERN, call_duration_ms, call_id, from_ms, get_store, to_ms
+from utils import metrics
+
+# One observed call; local is its Eastern start time
+Call = namedtuple("Call", "user_key call_id start_ms end_ms direction local")
+
+
+def make_call(user_key, cid, start_ms, duration_ms, direction):
+    local = from_ms(start_ms).astimezone(EASTERN)
+    return Call(user_key, cid, start_ms, start_ms + duration_ms, direction, local)
+
+
+def alert(rule, user_key, key, severity, message, **details):
+    # key identifies the condition; the same key is delivered at most once
+    return {"rule": rule, "user_key": user_key, "key": f"{rule}:{user_key}:{key}", "severity": severity,
+            "message": message, **details}
+
+
+def _clock(value):
+    return datetime.strptime(value, "%H:%M").time()
+
+
+# --- Rules: observe(call) on every new call, tick(now) for time-based checks
+class MissedInboundRule:
+    name = "missed_inbound"
+
+    def __init__(self, per_hour=ALERT_MISSED_PER_HOUR):
+        self.per_hour = per_hour
+        self._counts = {}  # (user_key, day, hour) -> missed inbound calls
+
+    def observe(self, call):
+        if call.end_ms > call.start_ms or call.direction != "INBOUND":
+            return []
+        hour = call.local.replace(minute=0, second=0, microsecond=0)
+        key = (call.user_key, hour.date(), hour.hour)
+        count = self._counts[key] = self._counts.get(key, 0) + 1
+        if count != self.per_hour:
+            return []
+        return [alert(self.name, call.user_key, hour.isoformat(), "warning",
+                      f"{count} missed inbound calls between {hour:%H:%M} and {hour + timedelta(hours=1):%H:%M}",
+                      value=count, threshold=self.per_hour)]
+
+    def tick(self, now):
+        return []
+
+    def prune(self, today):
+        self._counts = {k: v for k, v in self._counts.items() if k[1] >= today}
+
+
+class IdleGapRule:
+    """Gaps over `minutes` between calls inside the Eastern clock window (weekdays),
+    as in the nurse view's clock-in filter. Ongoing gaps are caught by tick(), so an
+    idle nurse is reported without waiting for the next call; the gap is keyed by
+    its starting call end, so it is reported once either way."""
+
+    name = "idle_gap"
+
+    def __init__(self, minutes=ALERT_IDLE_MINUTES, window=ALERT_CLOCK_WINDOW, weekdays_only=True):
+        self.minutes = minutes
+        self.clock_in, self.clock_out = (_clock(t) if isinstance(t, str) else t for t in window)
+        self.weekdays_only = weekdays_only
+        self._last = {}  # user_key -> (day, last start ms, latest end ms)
+
+    def in_window(self, local):
+        if self.weekdays_only and local.weekday() >= 5:
+            return False
+        return self.clock_in <= local.time() <= self.clock_out
+
+    def _gap(self, user_key, end_ms, until_ms, ongoing=False):
+        gap = (until_ms - end_ms) / 60000
+        if gap <= self.minutes:
+            return []
+        since = from_ms(end_ms).astimezone(EASTERN)
+        message = (f"idle for {gap:.0f} min since {since:%H:%M}" if ongoing
+                   else f"{gap:.0f} min idle between {since:%H:%M} and "
+                        f"{from_ms(until_ms).astimezone(EASTERN):%H:%M}")
+        return [alert(self.name, user_key, end_ms, "warning", message, value=round(gap, 1),
+                      threshold=self.minutes)]
+
+    def observe(self, call):
+        if not self.in_window(call.local):
+            return []
+        day = call.local.date()
+        last = self._last.get(call.user_key)
+        if last is not None and last[0] == day and call.start_ms < last[1]:
+            return []  # out of order: the gap it would close was already measured
+        same_day = last is not None and last[0] == day
+        self._last[call.user_key] = (day, call.start_ms, max(call.end_ms, last[2]) if same_day else call.end_ms)
+        return self._gap(call.user_key, last[2], call.start_ms) if same_day else []
+
+    def tick(self, now):
+        local = now.astimezone(EASTERN)
+        if not self.in_window(local):
+            return []
+        today, now_ms = local.date(), to_ms(now)
+        alerts = []
+        for user_key, (day, _, end_ms) in list(self._last.items()):
+            if day == today:
+                alerts += self._gap(user_key, end_ms, now_ms, ongoing=True)
+        return alerts
+
+    def prune(self, today):
+        self._last = {k: v for k, v in self._last.items() if v[0] >= today}
+
+
+class VolumeZoneRule:
+    """Team calls per Eastern day against the overall view's volume zones: entering a
+    higher zone is reported as info, and a day still in the lowest zone at
+    `low_check_hour` as a warning."""
+
+    name = "daily_volume"
+
+    def __init__(self, bins=VOLUME_ZONE_BINS, labels=VOLUME_ZONE_LABELS, low_check_hour=ALERT_LOW_VOLUME_HOUR):
+        self.bins = list(bins)
+        self.labels = list(labels)
+        self.low_check_hour = low_check_hour
+        self._totals = {}  # day -> team calls
+
+    def zone(self, total):
+        # Same (lower, upper] intervals as pd.cut in render_overall_view
+        return self.labels[min(max(bisect_left(self.bins, total) - 1, 0), len(self.labels) - 1)]
+
+    def observe(self, call):
+        day = call.local.date()
+        total = self._totals[day] = self._totals.get(day, 0) + 1
+        zone = self.zone(total)
+        if zone == self.zone(total - 1) or zone == self.labels[0]:
+            return []
+        return [alert(self.name, "team", f"{day}:{zone}", "info", f"team volume reached {zone} ({total} calls today)",
+                      value=total, zone=zone)]
+
+    def tick(self, now):
+        local = now.astimezone(EASTERN)
+        if local.weekday() >= 5 or local.hour < self.low_check_hour:
+            return []
+        total = self._totals.get(local.date(), 0)
+        if self.zone(total) != self.labels[0]:
+            return []
+        return [alert(self.name, "team", f"{local.date()}:low", "warning",
+                      f"team volume still {self.labels[0]} at {local:%H:%M} ({total} calls today)",
+                      value=total, zone=self.labels[0])]
+
+    def prune(self, today):
+        self._totals = {k: v for k, v in self._totals.items() if k >= today}
+
+
+# --- Sinks: callables taking one alert dict
+def log_sink(alert):
+    print(f"🚨 [{alert['severity']}] {alert['nurse']}: {alert['message']}")
+
+
+def file_sink(path=ALERT_FILE):
+    # JSON lines, appended; also the stand-in for external delivery in local testing
+    def send(alert):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(alert, default=str) + "\n")
+    return send
+
+
+def http_sink(url=ALERT_WEBHOOK_URL):
+    # Slack-compatible body ("text") plus the alert fields, for any webhook receiver
+    from api import client
+
+    def send(alert):
+        response = client.post(url, json={"text": f"🚨 {alert['nurse']}: {alert['message']}", **alert},
+                               retries=1, timeout=(2, 5))
+        response.raise_for_status()
+    return send
+
+
+SINKS = {"log": lambda: log_sink, "file": file_sink, "http": http_sink}
+
+
+class AlertEngine:
+    """Runs rules over new calls and delivers what they raise.
+
+    Calls already seen (by id, e.g. redelivered events) or not from today are
+    skipped. An alert key is delivered once, and after any alert a rule stays
+    quiet for that nurse for `cooldown` seconds. Sink failures are counted,
+    never raised into ingestion.
+    """
+
+    def __init__(self, rules=None, sinks=(), cooldown=ALERT_COOLDOWN_SECONDS, tick_every=ALERT_TICK_SECONDS,
+                 labeler=None):
+        self.rules = list(rules) if rules is not None else [MissedInboundRule(), IdleGapRule(), VolumeZoneRule()]
+        self.sinks = list(sinks)
+        self.cooldown = cooldown
+        self.tick_every = tick_every
+        self.labeler = labeler or (lambda user_key: user_key)
+        self.delivered = []   # the most recent alerts, newest last (bounded)
+        self._seen = {}       # (user_key, call_id) -> Eastern day
+        self._sent = {}       # alert key -> Eastern day
+        self._quiet_until = {}  # (rule, user_key) -> monotonic deadline
+        self._today = None
+        self._last_tick = None
+        self._lock = threading.Lock()
+
+    def observe(self, user_key, calls, silent=False, now=None):
+        # Only today's calls (Eastern) count: a backfilled or late event for an earlier
+        # day must not raise volume or missed-call alerts for that day
+        today = (now or datetime.now(timezone.utc)).astimezone(EASTERN).date()
+        records, batch, stale = [], set(), 0
+        for call in calls:
+            if not call.get("startTime"):
+                continue
+            cid = call_id(call)
+            # Redeliveries often land in the same batch, not only in later ones
+            if (user_key, cid) in self._seen or cid in batch:
+                continue
+            batch.add(cid)
+            record = make_call(user_key, cid, to_ms(call["startTime"]), call_duration_ms(call), call.get("direction"))
+            if record.local.date() != today:
+                stale += 1
+                continue
+            records.append(record)
+        if stale:
+            metrics.count("alert_calls_skipped_total", stale, reason="not_today")
+        return self._run(sorted(records, key=lambda c: c.start_ms), silent)
+
+    def seed(self, store=None, now=None):
+        # Today's stored calls set the rules' state without alerting (e.g. after a restart)
+        store = store or get_store()
+        day = (now or datetime.now(timezone.utc)).astimezone(EASTERN).date()
+        with store.transaction() as conn:
+            rows = conn.execute(
+                "SELECT user_key, call_id, start_ts, duration_ms, direction FROM calls WHERE day = ? ORDER BY start_ts",
+                (day.isoformat(),),
+            ).fetchall()
+        self._run([make_call(*row) for row in rows], silent=True)
+        return len(rows)
+
+    def _run(self, records, silent):
+        alerts = []
+        with self._lock:
+            for call in records:
+                self._seen[(call.user_key, call.call_id)] = call.local.date()
+                for rule in self.rules:
+                    alerts += rule.observe(call)
+        return [] if silent else self._deliver(alerts)
+
+    def tick(self, now=None):
+        # Time-based checks; cheap to call often, runs at most every tick_every seconds
+        if self._last_tick is not None and time.monotonic() - self._last_tick < self.tick_every:
+            return []
+        self._last_tick = time.monotonic()
+        now = now or datetime.now(timezone.utc)
+        today = now.astimezone(EASTERN).date()
+        alerts = []
+        with self._lock:
+            if today != self._today:
+                self._today = today
+                for rule in self.rules:
+                    rule.prune(today)
+                self._seen = {k: d for k, d in self._seen.items() if d >= today}
+                self._sent = {k: d for k, d in self._sent.items() if d >= today - timedelta(days=1)}
+            for rule in self.rules:
+                alerts += rule.tick(now)
+        return self._deliver(alerts)
+
+    def _deliver(self, alerts):
+        delivered = []
+        for item in alerts:
+            with self._lock:
+                if item["key"] in self._sent:
+                    metrics.count("alerts_total", rule=item["rule"], outcome="duplicate")
+                    continue
+                self._sent[item["key"]] = datetime.now(EASTERN).date()
+                quiet = (item["rule"], item["user_key"])
+                if time.monotonic() < self._quiet_until.get(quiet, 0):
+                    metrics.count("alerts_total", rule=item["rule"], outcome="cooldown")
+                    continue
+                self._quiet_until[quiet] = time.monotonic() + self.cooldown
+            item = {**item, "nurse": self.labeler(item["user_key"]) or item["user_key"],
+                    "at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+            for sink in self.sinks:
+                try:
+                    sink(item)
+                except Exception as e:
+                    metrics.count("alert_sink_errors_total", rule=item["rule"], error=type(e).__name__)
+            metrics.count("alerts_total", rule=item["rule"], outcome="sent")
+            delivered.append(item)
+        if delivered:
+            self.delivered = (self.delivered + delivered)[-200:]
+        return delivered
+
+
+def _label(user_key):
+    if user_key == "team":
+        return "Team"
+    from api.users import get_directory
+    return get_directory().known_label(user_key)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine(store=None):
+    # Built from config on first use and seeded from today's stored calls
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            sinks = [SINKS[name]() for name in ALERT_SINKS if name != "http" or ALERT_WEBHOOK_URL]
+            _engine = AlertEngine(sinks=sinks, labeler=_label)
+            _engine.seed(store)
+        return _engine
+
+
+def attach_alerts(ingestor):
+    # Hooks the engine into an api.events ingestor: stored batches are observed, idle checks tick
+    engine = get_alert_engine(ingestor.store)
+    ingestor.subscribe(on_calls=engine.observe, on_tick=engine.tick)
+    return engine
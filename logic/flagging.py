@@ -1,44 +1,70 @@
 # logic/flagging.py
+import numpy as np
 import pandas as pd
 from datetime import datetime
-import plotly.express as px
-import pytz
+from config import CHART_MAX_BARS
+from logic.gaps import annotate_gaps, threshold_column
+from utils.metrics import timed
+from utils.processing import EASTERN, format_minutes_to_hr_min, minutes, normalize_calls, with_end_times
 
 def process_call_data(calls, start_datetime: datetime, end_datetime: datetime, gap_threshold: int):
-    df = pd.DataFrame(calls)
+    df = normalize_calls(calls)
     if df.empty:
         return None
 
-    df["startTime"] = pd.to_datetime(df["startTime"], utc=True)
-    df["duration"] = pd.to_numeric(df["duration"], errors="coerce")
-    df["endTime"] = df["startTime"] + pd.to_timedelta(df["duration"], unit="s")
-
-    # ✅ Add this block to handle 'missed' calls
-    if "outcome" in df.columns:
-        df["missed"] = df["duration"] == 0
-
-    else:
-        df["missed"] = False
-
-    df = df.dropna(subset=["startTime", "endTime"])
-    df["duration_minutes"] = (df["endTime"] - df["startTime"]).dt.total_seconds() / 60
-    df = df.sort_values("startTime")
-
-    df["prev_end"] = df["endTime"].shift()
-    df["gap_minutes"] = (df["startTime"] - df["prev_end"]).dt.total_seconds() / 60
+    df = annotate_gaps(df, thresholds=(gap_threshold,))
     df["gap_minutes"] = df["gap_minutes"].fillna(0)
+    df["missed"] = ~df["is_answered"]
+    df["duration_minutes"] = minutes(df["duration_ms"])
+    df["endTime"], _ = with_end_times(df)
 
-    flagged = df[df["gap_minutes"] > gap_threshold].copy()
-
-    fig_gap_dist = px.histogram(df, x="gap_minutes", nbins=20, title="Gap Between Calls (Minutes)")
-    fig_timeline = px.timeline(df, x_start="startTime", x_end="endTime", y=df.index.astype(str), title="Call Timeline")
-    fig_timeline.update_yaxes(title="Call Index")
+    flagged = df[df[threshold_column(gap_threshold)]].copy()
 
     return {
         "df": df,
         "total_call_time": df["duration_minutes"].sum(),
         "flagged_gaps": flagged,
         "flag_count": len(flagged),
-        "fig_gap_dist": fig_gap_dist,
-        "fig_timeline": fig_timeline
     }
+
+
+# --- Chart builders: called only when a chart is actually shown
+@timed("chart")
+def gap_histogram(df, nbins=20):
+    # Pre-binned here, so the browser receives nbins bars rather than every gap value
+    import plotly.express as px
+    gaps = df["gap_minutes"].dropna().to_numpy()
+    counts, edges = np.histogram(gaps, bins=nbins) if len(gaps) else (np.zeros(0), np.zeros(1))
+    binned = pd.DataFrame({"gap_minutes": (edges[:-1] + edges[1:]) / 2, "count": counts})
+    fig = px.bar(binned, x="gap_minutes", y="count", title="Gap Between Calls (Minutes)",
+                 labels={"gap_minutes": "Gap (minutes)", "count": "Calls"})
+    fig.update_traces(width=np.diff(edges) if len(edges) > 1 else None)
+    return fig
+
+
+@timed("chart")
+def call_timeline(df, max_bars=CHART_MAX_BARS):
+    import plotly.express as px
+    end, _ = with_end_times(df)
+    lane = df["nurse"].astype(object).fillna("Calls")
+    if len(df) <= max_bars:
+        frame = pd.DataFrame({"start": df["startTime"], "end": end, "lane": lane, "calls": 1})
+        title = "Call Timeline"
+    else:
+        # One bar per nurse per time bucket, with the bucket sized to stay under max_bars
+        lanes = max(lane.nunique(), 1)
+        span = end.max() - df["startTime"].min()
+        bucket = max(pd.Timedelta(minutes=1), (span / (max_bars / lanes)).ceil("min"))
+        frame = (
+            pd.DataFrame({"start": df["startTime"], "end": end, "lane": lane, "calls": 1,
+                          "bucket": df["startTime"].dt.floor(bucket)})
+            .groupby(["lane", "bucket"], sort=False)
+            .agg(start=("start", "min"), end=("end", "max"), calls=("calls", "sum"))
+            .reset_index()
+        )
+        title = f"Call Timeline (calls grouped per {format_minutes_to_hr_min(bucket.total_seconds() / 60)})"
+    frame["start"] = frame["start"].dt.tz_convert(EASTERN)
+    frame["end"] = frame["end"].dt.tz_convert(EASTERN)
+    fig = px.timeline(frame, x_start="start", x_end="end", y="lane", hover_data=["calls"], title=title)
+    fig.update_yaxes(title="Nurse")
+    return fig
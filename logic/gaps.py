@@ -0,0 +1,75 @@
+# logic/gaps.py
+# Idle-gap detection over canonical call frames (see utils/processing.py).
+# One grouped pass covers any number of nurses, thresholds and a clock window.
+import pandas as pd
+
+from utils.metrics import timed
+from utils.processing import with_end_times
+
+DEFAULT_THRESHOLDS = (30,)
+
+
+def threshold_column(threshold):
+    return f"over_{threshold:g}"
+
+
+def in_clock_window(df, clock_in, clock_out, weekdays_only=True):
+    # Calls whose Eastern start time falls in [clock_in, clock_out], Mon–Fri by default
+    call_time = df["startTimeEastern"].dt.time
+    mask = (call_time >= clock_in) & (call_time <= clock_out)
+    if weekdays_only:
+        mask &= df["weekday"] < 5
+    return mask
+
+
+def _flag(df, prev_end, thresholds):
+    gap = (df["startTime"] - prev_end).dt.total_seconds() / 60
+    out = df.assign(prev_end=prev_end, gap_minutes=gap)
+    for threshold in thresholds:
+        out[threshold_column(threshold)] = gap > threshold
+    return out
+
+
+@timed("gaps")
+def annotate_gaps(df, thresholds=DEFAULT_THRESHOLDS, window=None, split_days=False):
+    """Copy of df sorted by nurse and start time, with prev_end, gap_minutes and
+    an over_<t> flag per threshold. A nurse's first call has no gap (NaN).
+
+    window: optional (clock_in, clock_out); calls outside it (or on weekends) are
+    dropped first, so gaps are measured between in-window calls only.
+    split_days: the first call of each Eastern day gets no gap, so overnight and
+    weekend breaks are not reported as idle time.
+    """
+    if window is not None:
+        df = df[in_clock_window(df, *window)]
+    df = df.sort_values(["user_key", "startTime"], kind="stable").reset_index(drop=True)
+
+    # Category codes keep the grouping numeric (and keep nurse-less frames as one group)
+    nurse = df["user_key"].cat.codes
+    end, _ = with_end_times(df)
+    prev_end = end.groupby(nurse, sort=False).shift()
+    if split_days:
+        day = df["date"].cat.codes
+        prev_end = prev_end.mask(day.ne(day.groupby(nurse, sort=False).shift()))
+    return _flag(df, prev_end, thresholds)
+
+
+def idle_gaps(df, thresholds=DEFAULT_THRESHOLDS, window=None, split_days=False):
+    # Only the rows whose gap exceeds the smallest threshold
+    annotated = annotate_gaps(df, thresholds, window, split_days)
+    return annotated[annotated[threshold_column(min(thresholds))]].reset_index(drop=True)
+
+
+def team_gap_summary(df, thresholds=(30, 60), window=None, split_days=True):
+    # One row per nurse: gap counts per threshold plus longest and total idle minutes
+    gaps = idle_gaps(df, thresholds, window, split_days)
+    counts = [threshold_column(t) for t in thresholds]
+    if gaps.empty:
+        return pd.DataFrame(columns=["nurse", *counts, "longest", "total"])
+    summary = gaps.groupby("nurse", observed=True).agg(
+        **{column: (column, "sum") for column in counts},
+        longest=("gap_minutes", "max"),
+        total=("gap_minutes", "sum"),
+    )
+    return summary.reset_index().sort_values("total", ascending=False, ignore_index=True)
+
@@ -1,60 +1,56 @@
 import pandas as pd
 import streamlit as st
-from datetime import datetime
-import pytz
-from api.users import get_users
-from api.calls import get_user_calls
-import plotly.express as px
-
-def format_minutes_to_hr_min(minutes):
-    hours = int(minutes // 60)
-    mins = int(minutes % 60)
-    return f"{hours} hr {mins} min"
-
+from api.users import get_directory
+from config import VOLUME_ZONE_BINS, VOLUME_ZONE_LABELS
+from api.calls import sync_calls_for_users
+from api.store import get_store
+from logic.gaps import team_gap_summary
+from logic.reports import benchmark_table, load_report, report_manifest
+from logic.rollups import load_daily_rollups
+from utils.metrics import timed
+from utils.processing import format_minutes_to_hr_min, normalize_call_rows
+from utils.ranges import eastern_bounds
+from utils.tables import raw, render_paged_table, time_text
+
+@timed("render_overall")
 def render_overall_view(start_date, end_date):
+    import plotly.express as px  # imported with the first chart, not with the module
     # Time conversion
-    eastern = pytz.timezone("US/Eastern")
-    shift_start = eastern.localize(datetime.combine(start_date, datetime.min.time())).astimezone(pytz.UTC)
-    shift_end = eastern.localize(datetime.combine(end_date, datetime.max.time())).astimezone(pytz.UTC)
+    shift_start_str, shift_end_str = eastern_bounds(start_date, end_date)
 
-    shift_start_str = shift_start.strftime("%Y-%m-%dT%H:%M:%SZ")
-    shift_end_str = shift_end.strftime("%Y-%m-%dT%H:%M:%SZ")
+    nurse_names = get_directory().labels()
+    failed = []
 
-    users = get_users()
-    all_calls = []
+    # --- Concurrent sync into the local store, results arrive as each nurse completes
+    progress = st.progress(0.0, text="Fetching call history...")
+    for done, (user_key, _, error) in enumerate(
+        sync_calls_for_users(list(nurse_names), shift_start_str, shift_end_str), start=1
+    ):
+        progress.progress(done / len(nurse_names), text=f"Fetched {done}/{len(nurse_names)} nurses")
+        if error is not None:
+            failed.append(f"{nurse_names[user_key]} ({error})")
+    progress.empty()
 
-    for user in users:
-        calls = get_user_calls(user["userKey"], shift_start_str, shift_end_str)
-        for call in calls:
-            call["nurse"] = user.get("name") or user.get("email") or "Unknown"
-        all_calls.extend(calls)
+    if failed:
+        st.warning("Could not fetch calls for: " + ", ".join(failed))
 
-    df = pd.DataFrame(all_calls)
+    # --- Everything below reads per-nurse daily rollups, not raw calls
+    rollups = load_daily_rollups(nurse_names, start_date, end_date)
 
-    if df.empty:
+    if rollups.empty or rollups["total_calls"].sum() == 0:
         st.warning("No call data found for this period.")
         return
 
-    df["startTime"] = pd.to_datetime(df["startTime"], errors="coerce", utc=True)
-
-    if "endTime" in df.columns and df["endTime"].notnull().any():
-        df["endTime"] = pd.to_datetime(df["endTime"], errors="coerce", utc=True)
-        df["duration"] = (df["endTime"] - df["startTime"]).dt.total_seconds() / 60
-    else:
-        df["duration"] = df["duration"] / 60000  # fallback in ms
-
-    df["duration"] = df["duration"].fillna(0)
-    df["startTimeEastern"] = df["startTime"].dt.tz_convert("US/Eastern")
-    df["date"] = df["startTimeEastern"].dt.date
-    df["hour"] = df["startTimeEastern"].dt.floor("h")
+    rollups["nurse"] = rollups["user_key"].map(nurse_names)
+    rollups["date"] = rollups["day"]
+    rollups["talk_time"] = rollups["talk_time_ms"] / 60000
 
     # --- Metrics
-    missed_df = df[(df["duration"] == 0) & (df["direction"] == "INBOUND")]
-    total_calls = len(df)
-    answered_calls = len(df[df["duration"] > 0])
-    missed_calls = len(missed_df)
-    total_talk_time = df[df["duration"] > 0]["duration"].sum()
-    avg_duration = df[df["duration"] > 0]["duration"].mean()
+    total_calls = int(rollups["total_calls"].sum())
+    answered_calls = int(rollups["answered_calls"].sum())
+    missed_calls = int(rollups["missed_inbound"].sum())
+    total_talk_time = rollups["talk_time"].sum()
+    avg_duration = total_talk_time / answered_calls if answered_calls else 0
 
     col1, col2, col3, col4, col5 = st.columns(5)
     col1.metric("Total Calls", total_calls)
@@ -64,11 +60,11 @@ def render_overall_view(start_date, end_date):
     col5.metric("Avg Call Duration", format_minutes_to_hr_min(avg_duration or 0))
 
     # --- Chart 1: Daily Call Volume Classification
-    daily_volume = df.groupby("date").size().reset_index(name="Total Calls")
+    daily_volume = rollups.groupby("date")["total_calls"].sum().reset_index(name="Total Calls")
     daily_volume["Zone"] = pd.cut(
         daily_volume["Total Calls"],
-        bins=[-1, 30, 70, float("inf")],
-        labels=["Low", "Moderate", "High"]
+        bins=VOLUME_ZONE_BINS,
+        labels=VOLUME_ZONE_LABELS
     )
     fig1 = px.bar(
         daily_volume,
@@ -81,18 +77,16 @@ def render_overall_view(start_date, end_date):
     st.plotly_chart(fig1, use_container_width=True)
 
     # --- Chart 2: Total Talk Time per Day
-    daily_talk = df[df["duration"] > 0].groupby("date")["duration"].sum().reset_index()
-    daily_talk["Talk Time"] = daily_talk["duration"].apply(format_minutes_to_hr_min)
+    daily_talk = rollups[rollups["talk_time"] > 0].groupby("date")["talk_time"].sum().reset_index()
+    daily_talk["Talk Time"] = daily_talk["talk_time"].apply(format_minutes_to_hr_min)
     st.subheader("🕐 Total Talk Time per Day")
     st.dataframe(daily_talk[["date", "Talk Time"]], use_container_width=True)
 
     # --- Chart 3: Call Outcomes Breakdown per Nurse (Inbound Missed Only)
-    outcomes = df.copy()
-    outcomes["Answered"] = outcomes["duration"] > 0
-    outcomes["MissedInbound"] = (outcomes["duration"] == 0) & (outcomes["direction"] == "INBOUND")
-    filtered = outcomes[(outcomes["Answered"]) | (outcomes["MissedInbound"])].copy()
-    filtered["Status"] = filtered.apply(lambda row: "Answered" if row["Answered"] else "Missed", axis=1)
-    outcome_summary = filtered.groupby(["nurse", "Status"]).size().reset_index(name="Count")
+    per_nurse = rollups.groupby("nurse")[["answered_calls", "missed_inbound"]].sum()
+    per_nurse.columns = ["Answered", "Missed"]
+    outcome_summary = per_nurse.reset_index().melt(id_vars="nurse", var_name="Status", value_name="Count")
+    outcome_summary = outcome_summary[outcome_summary["Count"] > 0]
 
     if outcome_summary.empty:
         st.info("No call data to display in Call Outcomes Breakdown chart.")
@@ -109,11 +103,50 @@ def render_overall_view(start_date, end_date):
         fig3.update_traces(textposition='inside')
         st.plotly_chart(fig3, use_container_width=True)
 
-    # --- Missed Call Log
-    if not missed_df.empty:
-        missed_df["Missed Time (Eastern)"] = missed_df["startTime"].dt.tz_convert("US/Eastern")
-        missed_df["Caller"] = missed_df["caller"].apply(lambda x: x.get("number") if isinstance(x, dict) else None)
-        missed_df["Callee"] = missed_df["callee"].apply(lambda x: x.get("number") if isinstance(x, dict) else None)
-        table = missed_df[["Missed Time (Eastern)", "direction", "nurse", "Caller", "Callee"]]
-        st.subheader("📋 Missed Inbound Calls Log")
-        st.dataframe(table.sort_values("Missed Time (Eastern)"), use_container_width=True)
+    # --- Missed Call Log: paginated; only the visible page is formatted
+    st.subheader("📋 Missed Inbound Calls Log")
+    missed_rows = get_store().load_call_rows(nurse_names, shift_start_str, shift_end_str, missed_inbound_only=True)
+    if missed_rows:
+        render_paged_table(
+            normalize_call_rows(missed_rows, nurse_names),
+            columns={
+                "Missed Time (Eastern)": time_text("startTimeEastern"),
+                "direction": raw("direction"),
+                "nurse": raw("nurse"),
+                "Caller": raw("Caller"),
+                "Callee": raw("Callee"),
+            },
+            key="overall_missed",
+            sort_columns={"Missed Time": "startTime", "Nurse": "nurse"},
+            search_columns=("nurse", "Caller", "Callee"),
+            file_name=f"missed_inbound_{start_date}_{end_date}",
+        )
+    else:
+        st.write("No missed inbound calls in this period.")
+
+    # --- Team Idle Gaps: one grouped pass over every nurse's calls, built only on request; overnight breaks are not counted
+    st.subheader("⏱️ Team Idle Gaps")
+    if st.toggle("Show team idle gaps", key="overall_gaps"):
+        call_rows = get_store().load_call_rows(nurse_names, shift_start_str, shift_end_str)
+        idle = team_gap_summary(normalize_call_rows(call_rows, nurse_names), thresholds=(30, 60))
+        if idle.empty:
+            st.write("No gaps greater than 30 minutes found.")
+        else:
+            idle["longest"] = idle["longest"].apply(format_minutes_to_hr_min)
+            idle["total"] = idle["total"].apply(format_minutes_to_hr_min)
+            st.dataframe(
+                idle.rename(columns={
+                    "nurse": "Nurse", "over_30": "Gaps > 30 min", "over_60": "Gaps > 60 min",
+                    "longest": "Longest Gap", "total": "Total Idle Time",
+                }),
+                use_container_width=True,
+            )
+
+    # --- Team Benchmarks by Shift: read from the batch report (python -m logic.reports)
+    st.subheader("📈 Team Benchmarks by Shift")
+    report = load_report("team_weekly")
+    if report is None or report.empty:
+        st.caption("No benchmark report yet; run `python -m logic.reports`.")
+    else:
+        st.caption(f"Report generated {report_manifest()['generated_at']}.")
+        st.dataframe(benchmark_table(report, team=True), use_container_width=True, hide_index=True)
@@ -0,0 +1,315 @@
+# logic/reports.py
+# Historical benchmarking by nurse, team and shift, computed offline from the local call store:
+#   python -m logic.reports --weeks 13
+# Writes nurse_weekly and team_weekly tables (Parquet when pyarrow is installed, else CSV)
+# plus a manifest to REPORT_DIR; the dashboard only reads them (load_report).
+import argparse
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    CALL_STORE_PATH, REPORT_BASELINE_WEEKS, REPORT_CHUNK_NURSES, REPORT_DIR, REPORT_SHIFTS,
+    REPORT_WEEKS, REPORT_WORKERS, ROLLUP_GAP_MINUTES,
+)
+from api.store import CALL_COLUMNS, day_bounds, to_ms
+from logic.gaps import annotate_gaps, threshold_column
+from utils.processing import normalize_call_rows
+
+KEYS = ["user_key", "shift", "week"]
+# Per-week totals; rates and trends are derived from these
+TOTALS = ["calls", "answered", "missed_inbound", "talk_min", "gaps_over"]
+# Compared against the rolling baseline and the previous week
+TRENDED = ["calls", "answer_rate", "talk_min", "dur_p50_min", "idle_p90_min"]
+OFF_SHIFT = "Off-shift"
+
+
+def shift_labels(shifts=REPORT_SHIFTS):
+    # Eastern start hour -> shift name; ranges may wrap midnight (23, 7)
+    labels = np.full(24, OFF_SHIFT, dtype=object)
+    for name, (first, last) in shifts.items():
+        hours = range(first, last) if first < last else [*range(first, 24), *range(0, last)]
+        labels[list(hours)] = name
+    return labels
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+# --- Worker side: one process handles a chunk of nurses end to end
+def _load_calls(store_path, user_keys, start_ms, end_ms):
+    # Read-only connection per worker; the dashboard may be writing to the same file
+    conn = sqlite3.connect(f"file:{os.path.abspath(store_path)}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(CALL_COLUMNS)} FROM calls "
+            f"WHERE user_key IN ({', '.join('?' * len(user_keys))}) AND start_ts >= ? AND start_ts < ? "
+            f"ORDER BY user_key, start_ts",
+            (*user_keys, start_ms, end_ms),
+        ).fetchall()
+    finally:
+        conn.close()
+    return normalize_call_rows(rows)
+
+
+def weekly_metrics(calls, shifts=REPORT_SHIFTS, gap_minutes=ROLLUP_GAP_MINUTES):
+    """Per nurse, shift and week (Monday, Eastern): totals, answer rate, answered-call
+    duration percentiles and the 90th percentile idle gap between calls of the same day.
+
+    calls is a canonical call frame; gaps come from annotate_gaps, as in the dashboard."""
+    if calls.empty:
+        return pd.DataFrame(columns=[*KEYS, *TOTALS, "answer_rate", "dur_p50_min", "dur_p90_min", "idle_p90_min"])
+    calls = annotate_gaps(calls, thresholds=(gap_minutes,), split_days=True)
+    day = calls["startTimeEastern"].dt.tz_localize(None).dt.normalize()
+    answered = calls["is_answered"]
+    calls = pd.DataFrame({
+        "user_key": calls["user_key"].astype(object),
+        "week": day - pd.to_timedelta(calls["weekday"], unit="D"),
+        "shift": shift_labels(shifts)[calls["hour"].to_numpy()],
+        "answered": answered,
+        "missed_inbound": calls["is_missed_inbound"],
+        "talk_min": calls["duration_ms"].where(answered, 0) / 60000,
+        # Overlapping calls leave no idle time
+        "gap_min": calls["gap_minutes"].clip(lower=0),
+        "gaps_over": calls[threshold_column(gap_minutes)],
+        "dur_min": (calls["duration_ms"] / 60000).where(answered),
+    })
+
+    grouped = calls.groupby(KEYS, sort=True)
+    out = grouped.agg(
+        calls=("answered", "size"),
+        answered=("answered", "sum"),
+        missed_inbound=("missed_inbound", "sum"),
+        talk_min=("talk_min", "sum"),
+        gaps_over=("gaps_over", "sum"),
+        dur_p50_min=("dur_min", "median"),
+    )
+    out["dur_p90_min"] = grouped["dur_min"].quantile(0.9)
+    out["idle_p90_min"] = grouped["gap_min"].quantile(0.9)
+    out["answer_rate"] = out["answered"] / out["calls"]
+    return out.reset_index()
+
+
+def with_trends(weekly, keys, weeks, baseline_weeks=REPORT_BASELINE_WEEKS):
+    """Adds <metric>_baseline (mean over the previous `baseline_weeks` weeks, skipping weeks
+    without activity),
+    <metric>_vs_baseline and <metric>_wow (relative change; answer_rate in points).
+
+    Rows are laid out on a full keys x weeks grid, so every group is a column of the
+    same length and shift/rolling run once for all groups instead of per group."""
+    groups = weekly[keys].drop_duplicates()
+    if groups.empty:
+        return weekly
+    grid = pd.MultiIndex.from_tuples(
+        [(*g, w) for g in groups.itertuples(index=False) for w in weeks], names=[*keys, "week"]
+    )
+    full = weekly.set_index([*keys, "week"]).reindex(grid)
+    n_groups, n_weeks = len(groups), len(weeks)
+    for metric in TRENDED:
+        values = pd.DataFrame(full[metric].to_numpy(dtype=float).reshape(n_groups, n_weeks).T)
+        previous = values.shift(1)
+        baseline = previous.rolling(baseline_weeks, min_periods=1).mean()
+        if metric == "answer_rate":
+            wow, vs_baseline = values - previous, values - baseline
+        else:
+            wow = values / previous.where(previous > 0) - 1
+            vs_baseline = values / baseline.where(baseline > 0) - 1
+        full[f"{metric}_baseline"] = baseline.to_numpy().T.ravel()
+        full[f"{metric}_vs_baseline"] = vs_baseline.to_numpy().T.ravel()
+        full[f"{metric}_wow"] = wow.to_numpy().T.ravel()
+    return full[full["calls"].notna()].reset_index()
+
+
+def _report_chunk(store_path, user_keys, history_start, end, shifts, gap_minutes, baseline_weeks):
+    start_ms, end_ms = to_ms(day_bounds(history_start)[0]), to_ms(day_bounds(end)[1])
+    weekly = weekly_metrics(_load_calls(store_path, user_keys, start_ms, end_ms), shifts, gap_minutes)
+    weeks = pd.date_range(pd.Timestamp(week_start(history_start)), pd.Timestamp(week_start(end)), freq="7D")
+    return with_trends(weekly, ["user_key", "shift"], weeks, baseline_weeks)
+
+
+# --- Parent side
+def team_weekly(nurse_weekly, weeks, baseline_weeks=REPORT_BASELINE_WEEKS):
+    """Per shift and week: team totals, the spread of per-nurse weekly volume and answer
+    rate (p25/p50/p75), and the same baseline/week-over-week trends as nurses get."""
+    grouped = nurse_weekly.groupby(["shift", "week"], sort=True)
+    team = grouped[TOTALS].sum()
+    team["nurses"] = grouped["user_key"].nunique()
+    team["answer_rate"] = team["answered"] / team["calls"]
+    for q in (0.25, 0.5, 0.75):
+        team[f"nurse_calls_p{int(q * 100)}"] = grouped["calls"].quantile(q)
+    team["nurse_answer_rate_p50"] = grouped["answer_rate"].median()
+    # Team-level percentiles of call length and idle time: medians of the nurses' values
+    team["dur_p50_min"] = grouped["dur_p50_min"].median()
+    team["idle_p90_min"] = grouped["idle_p90_min"].median()
+    return with_trends(team.reset_index(), ["shift"], weeks, baseline_weeks)
+
+
+def _store_nurses(store_path, start, end):
+    conn = sqlite3.connect(f"file:{os.path.abspath(store_path)}?mode=ro", uri=True)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT DISTINCT user_key FROM calls WHERE start_ts >= ? AND start_ts < ? ORDER BY user_key",
+            (to_ms(day_bounds(start)[0]), to_ms(day_bounds(end)[1])),
+        )]
+    finally:
+        conn.close()
+
+
+def build_reports(start, end, store_path=CALL_STORE_PATH, user_keys=None, workers=REPORT_WORKERS,
+                  chunk_nurses=REPORT_CHUNK_NURSES, shifts=REPORT_SHIFTS, gap_minutes=ROLLUP_GAP_MINUTES,
+                  baseline_weeks=REPORT_BASELINE_WEEKS):
+    """(nurse_weekly, team_weekly) for the weeks overlapping [start, end].
+
+    History from `baseline_weeks` earlier is read too, so the first reported weeks
+    already have a baseline. Nurses are split into chunks of `chunk_nurses`, one
+    process-pool task each (workers=1 runs inline)."""
+    history_start = week_start(start) - timedelta(weeks=baseline_weeks)
+    user_keys = list(user_keys) if user_keys else _store_nurses(store_path, history_start, end)
+    chunks = [user_keys[i:i + chunk_nurses] for i in range(0, len(user_keys), chunk_nurses)]
+    args = (history_start, end, shifts, gap_minutes, baseline_weeks)
+    if workers == 1 or len(chunks) <= 1:
+        parts = [_report_chunk(store_path, chunk, *args) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_report_chunk, store_path, chunk, *args) for chunk in chunks]
+            parts = [f.result() for f in futures]
+
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(), pd.DataFrame()
+    nurses = pd.concat(parts, ignore_index=True)
+    # Where each nurse stands among the team for the same shift and week (1.0 = busiest)
+    nurses["calls_rank_pct"] = nurses.groupby(["shift", "week"])["calls"].rank(pct=True)
+
+    weeks = pd.date_range(pd.Timestamp(history_start), pd.Timestamp(week_start(end)), freq="7D")
+    team = team_weekly(nurses, weeks, baseline_weeks)
+    first_week = pd.Timestamp(week_start(start))
+    nurses = nurses[nurses["week"] >= first_week].sort_values(KEYS, ignore_index=True)
+    team = team[team["week"] >= first_week].sort_values(["shift", "week"], ignore_index=True)
+    for df in (nurses, team):
+        df["week"] = df["week"].dt.date
+    return nurses, team
+
+
+def write_table(df, directory, name, fmt="auto"):
+    # Parquet when asked for, or on "auto" when pyarrow is installed; CSV otherwise
+    if fmt in ("auto", "parquet"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            if fmt == "parquet":
+                raise
+        else:
+            path = os.path.join(directory, f"{name}.parquet")
+            df.to_parquet(path, index=False)
+            return path
+    path = os.path.join(directory, f"{name}.csv")
+    df.to_csv(path, index=False, float_format="%.4g")
+    return path
+
+
+def write_reports(nurse_weekly, team_weekly, directory=REPORT_DIR, fmt="auto", **manifest):
+    os.makedirs(directory, exist_ok=True)
+    files = {name: os.path.basename(write_table(df, directory, name, fmt))
+             for name, df in (("nurse_weekly", nurse_weekly), ("team_weekly", team_weekly))}
+    manifest = {"generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "files": files, **manifest}
+    # Written last, so a reader never sees a manifest pointing at half-written tables
+    tmp = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp, os.path.join(directory, "manifest.json"))
+    return manifest
+
+
+# --- Dashboard side
+_loaded = {}   # path -> (mtime, frame)
+
+
+def report_manifest(directory=REPORT_DIR):
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_report(name, directory=REPORT_DIR):
+    """The latest `name` table ("nurse_weekly" or "team_weekly"), or None when no
+    report has been generated. Re-read only when the file changes."""
+    manifest = report_manifest(directory)
+    if not manifest or name not in manifest.get("files", {}):
+        return None
+    path = os.path.join(directory, manifest["files"][name])
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        df["week"] = pd.to_datetime(df["week"]).dt.date
+        _loaded[path] = cached = (mtime, df)
+    return cached[1]
+
+
+def benchmark_table(df, team=False):
+    # Display columns for the dashboard; relative changes as percentages, answer-rate changes in points
+    pct = lambda s: (s * 100).round(1)
+    table = pd.DataFrame({
+        "Week": df["week"],
+        "Shift": df["shift"],
+        **({"Nurses": df["nurses"]} if team else {}),
+        "Calls": df["calls"],
+        "vs Baseline (%)": pct(df["calls_vs_baseline"]),
+        "WoW (%)": pct(df["calls_wow"]),
+        "Answer Rate (%)": pct(df["answer_rate"]),
+        "Answer Rate WoW (pts)": pct(df["answer_rate_wow"]),
+        "Median Call (min)": df["dur_p50_min"].round(1),
+        "Idle p90 (min)": df["idle_p90_min"].round(1),
+    })
+    if team:
+        table["Nurse Calls p25–p75"] = [f"{a:g}–{b:g}" for a, b in zip(df["nurse_calls_p25"], df["nurse_calls_p75"])]
+    else:
+        table["Team Rank (pct)"] = pct(df["calls_rank_pct"])
+    return table.sort_values(["Week", "Shift"], ascending=[False, True], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build weekly benchmarking reports by nurse, team and shift")
+    parser.add_argument("--end", type=date.fromisoformat, default=None,
+                        help="last day to include (default: the Sunday of last full week)")
+    parser.add_argument("--weeks", type=int, default=REPORT_WEEKS, help="weeks to report, ending at --end")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="overrides --weeks")
+    parser.add_argument("--nurses", nargs="+", default=None, help="userKeys (default: every nurse in the store)")
+    parser.add_argument("--store", default=CALL_STORE_PATH)
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--format", choices=["auto", "parquet", "csv"], default="auto")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS, help="processes (default: one per CPU)")
+    parser.add_argument("--baseline-weeks", type=int, default=REPORT_BASELINE_WEEKS)
+    args = parser.parse_args()
+
+    end = args.end or week_start(date.today()) - timedelta(days=1)
+    start = args.start or week_start(end) - timedelta(weeks=args.weeks - 1)
+    started = time.perf_counter()
+    print(f"📊 Building reports for {start} → {end} from {args.store}...", flush=True)
+    nurses, team = build_reports(start, end, args.store, args.nurses, args.workers,
+                                 baseline_weeks=args.baseline_weeks)
+    if nurses.empty:
+        print("⚠️ No calls in the store for this period; run a sync first.")
+        return
+    manifest = write_reports(nurses, team, args.out, args.format, start=start, end=end,
+                             baseline_weeks=args.baseline_weeks, nurses=int(nurses["user_key"].nunique()),
+                             shifts=REPORT_SHIFTS)
+    print(f"✅ {manifest['nurses']} nurses, {len(nurses)} nurse-shift-weeks in "
+          f"{time.perf_counter() - started:.1f}s → {args.out} ({', '.join(manifest['files'].values())})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# logic/rollups.py
+from api.store import get_store
+from config import ROLLUP_GAP_MINUTES
+from utils.metrics import timed
+
+# Rollups live next to the calls in the store's database. add_calls() marks the
+# (nurse, day) pairs it touched as dirty; only those days are rebuilt, on next read.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    user_key        TEXT NOT NULL,
+    day             TEXT NOT NULL,
+    total_calls     INTEGER NOT NULL,
+    inbound_calls   INTEGER NOT NULL,
+    outbound_calls  INTEGER NOT NULL,
+    answered_calls  INTEGER NOT NULL,
+    missed_calls    INTEGER NOT NULL,
+    missed_inbound  INTEGER NOT NULL,
+    talk_time_ms    INTEGER NOT NULL,
+    longest_call_ms INTEGER NOT NULL,
+    gap_count       INTEGER NOT NULL,
+    max_gap_ms      INTEGER,
+    total_gap_ms    INTEGER,
+    PRIMARY KEY (user_key, day)
+);
+CREATE TABLE IF NOT EXISTS hourly_rollup (
+    user_key       TEXT NOT NULL,
+    day            TEXT NOT NULL,
+    hour           INTEGER NOT NULL,
+    total_calls    INTEGER NOT NULL,
+    answered_calls INTEGER NOT NULL,
+    missed_inbound INTEGER NOT NULL,
+    talk_time_ms   INTEGER NOT NULL,
+    PRIMARY KEY (user_key, day, hour)
+);
+"""
+
+DIRTY = "(user_key, day) IN (SELECT user_key, day FROM dirty_days)"
+
+REBUILD_DAILY = f"""
+INSERT INTO daily_rollup
+SELECT user_key, day,
+       COUNT(*),
+       SUM(direction = 'INBOUND'),
+       SUM(direction = 'OUTBOUND'),
+       SUM(duration_ms > 0),
+       SUM(duration_ms = 0),
+       SUM(duration_ms = 0 AND direction = 'INBOUND'),
+       SUM(CASE WHEN duration_ms > 0 THEN duration_ms ELSE 0 END),
+       MAX(duration_ms),
+       COALESCE(SUM(gap_ms > :gap_ms), 0),
+       MAX(gap_ms),
+       SUM(gap_ms)
+FROM (
+    SELECT *, MAX(0, start_ts - LAG(start_ts + duration_ms) OVER (
+        PARTITION BY user_key, day ORDER BY start_ts
+    )) AS gap_ms
+    FROM calls WHERE {DIRTY}
+)
+GROUP BY user_key, day
+"""
+
+REBUILD_HOURLY = f"""
+INSERT INTO hourly_rollup
+SELECT user_key, day, hour,
+       COUNT(*),
+       SUM(duration_ms > 0),
+       SUM(duration_ms = 0 AND direction = 'INBOUND'),
+       SUM(CASE WHEN duration_ms > 0 THEN duration_ms ELSE 0 END)
+FROM calls WHERE {DIRTY}
+GROUP BY user_key, day, hour
+"""
+
+DAILY_COLUMNS = [
+    "user_key", "day", "total_calls", "inbound_calls", "outbound_calls", "answered_calls",
+    "missed_calls", "missed_inbound", "talk_time_ms", "longest_call_ms", "gap_count",
+    "max_gap_ms", "total_gap_ms",
+]
+HOURLY_COLUMNS = ["user_key", "day", "hour", "total_calls", "answered_calls", "missed_inbound", "talk_time_ms"]
+
+_ready = set()
+
+
+@timed("aggregate")
+def refresh_rollups(store=None):
+    store = store or get_store()
+    with store.transaction() as conn:
+        if id(store) not in _ready:
+            conn.executescript(SCHEMA)
+            _ready.add(id(store))
+        dirty = conn.execute("SELECT COUNT(*) FROM dirty_days").fetchone()[0]
+        if not dirty:
+            return 0
+        conn.execute(f"DELETE FROM daily_rollup WHERE {DIRTY}")
+        conn.execute(f"DELETE FROM hourly_rollup WHERE {DIRTY}")
+        conn.execute(REBUILD_DAILY, {"gap_ms": ROLLUP_GAP_MINUTES * 60000})
+        conn.execute(REBUILD_HOURLY)
+        conn.execute("DELETE FROM dirty_days")
+    return dirty
+
+
+def _select(select, table, user_keys, start_date, end_date, store, order=""):
+    store = store or get_store()
+    refresh_rollups(store)
+    if not user_keys:
+        return []
+    with store.transaction() as conn:
+        return conn.execute(
+            f"SELECT {select} FROM {table} "
+            f"WHERE user_key IN ({', '.join('?' * len(user_keys))}) AND day BETWEEN ? AND ? {order}",
+            (*user_keys, start_date.isoformat(), end_date.isoformat()),
+        ).fetchall()
+
+
+def _load(table, columns, user_keys, start_date, end_date, store):
+    import pandas as pd  # only the DataFrame loaders need it; sum_daily_rollups does not
+    rows = _select(", ".join(columns), table, list(user_keys), start_date, end_date, store, "ORDER BY day")
+    df = pd.DataFrame(rows, columns=columns)
+    df["day"] = pd.to_datetime(df["day"]).dt.date
+    return df
+
+
+@timed("aggregate")
+def load_daily_rollups(user_keys, start_date, end_date, store=None):
+    # One row per nurse per Eastern day in [start_date, end_date]
+    return _load("daily_rollup", DAILY_COLUMNS, user_keys, start_date, end_date, store)
+
+
+@timed("aggregate")
+def sum_daily_rollups(user_keys, start_date, end_date, store=None):
+    # {column: total} over the range, summed in SQL (no pandas), e.g. for the webhook service
+    totals = [c for c in DAILY_COLUMNS if c not in ("user_key", "day", "longest_call_ms", "max_gap_ms")]
+    rows = _select(", ".join(f"COALESCE(SUM({c}), 0)" for c in totals), "daily_rollup",
+                   list(user_keys), start_date, end_date, store)
+    return dict(zip(totals, rows[0] if rows else [0] * len(totals)))
+
+
+@timed("aggregate")
+def load_hourly_rollups(user_keys, start_date, end_date, store=None):
+    return _load("hourly_rollup", HOURLY_COLUMNS, user_keys, start_date, end_date, store)
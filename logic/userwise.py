@@ -1,75 +1,57 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import pytz
-import plotly.express as px
-from api.calls import get_user_calls
-
+from api.calls import get_user_call_frame
+from logic.flagging import call_timeline, gap_histogram
+from logic.gaps import annotate_gaps
+from logic.reports import benchmark_table, load_report, report_manifest
+from utils.metrics import timed
+from utils.processing import format_minutes_to_hr_min, minutes, with_end_times
+from utils.ranges import eastern_bounds
+from utils.tables import duration_text, raw, render_paged_table, time_text
+
+@timed("render_userwise")
 def render_userwise_view(user_key, start_date, end_date):
+    import plotly.express as px  # imported with the first chart, not with the module
     st.markdown("### Nurse Call Analytics")
 
-    def format_minutes_to_hr_min(minutes):
-        if pd.isna(minutes):
-            return "0 hr 0 min"
-        hours = int(minutes // 60)
-        mins = int(minutes % 60)
-        return f"{hours} hr {mins} min"
-
     # --- Sidebar Clock-In/Out Time Inputs ---
     st.sidebar.markdown("Filter by Clocked-In Hours (Weekdays Only)")
     clock_in = st.sidebar.time_input("Clock-In Time", value=datetime.strptime("09:00", "%H:%M").time())
     clock_out = st.sidebar.time_input("Clock-Out Time", value=datetime.strptime("17:00", "%H:%M").time())
 
     # --- Time Range Setup ---
-    eastern = pytz.timezone("US/Eastern")
-    shift_start = eastern.localize(datetime.combine(start_date, datetime.min.time())).astimezone(pytz.UTC)
-    shift_end = eastern.localize(datetime.combine(end_date, datetime.max.time())).astimezone(pytz.UTC)
-    shift_start_str = shift_start.strftime("%Y-%m-%dT%H:%M:%SZ")
-    shift_end_str = shift_end.strftime("%Y-%m-%dT%H:%M:%SZ")
+    shift_start_str, shift_end_str = eastern_bounds(start_date, end_date)
 
     try:
-        calls = get_user_calls(user_key, shift_start_str, shift_end_str)
+        df = get_user_call_frame(user_key, shift_start_str, shift_end_str)
     except Exception as e:
         st.error(f"Failed to fetch calls: {e}")
         return
 
-    if not calls:
+    if df.empty:
         st.warning("No call data found for this nurse in the selected range.")
         return
 
-    df = pd.DataFrame(calls)
-    df["startTime"] = pd.to_datetime(df["startTime"], errors="coerce", utc=True)
-    df["duration"] = pd.to_numeric(df["duration"], errors="coerce") / 60000
-    df["duration"] = df["duration"].fillna(0)
-    df["endTime"] = df["startTime"] + pd.to_timedelta(df["duration"], unit="m")
-
-    df["startTimeEastern"] = df["startTime"].dt.tz_convert("US/Eastern")
-    df["endTimeEastern"] = df["endTime"].dt.tz_convert("US/Eastern")
-
-    df["Caller"] = df["caller"].apply(lambda x: x.get("number") if isinstance(x, dict) else None)
-    df["Callee"] = df["callee"].apply(lambda x: x.get("number") if isinstance(x, dict) else None)
-
-    # --- Apply Mon–Fri Filter
-    df["weekday"] = df["startTimeEastern"].dt.weekday
-    df = df[df["weekday"] < 5]  # 0–4 = Monday–Friday
-
-    # --- Apply Clocked-In Time Filter
-    df["call_time_only"] = df["startTimeEastern"].dt.time
-    df = df[(df["call_time_only"] >= clock_in) & (df["call_time_only"] <= clock_out)]
+    # --- Apply Mon–Fri and Clocked-In Time Filters (one combined mask, one selection)
+    call_time_only = df["startTimeEastern"].dt.time
+    in_window = (df["weekday"] < 5) & (call_time_only >= clock_in) & (call_time_only <= clock_out)
+    df = df[in_window].reset_index(drop=True)
 
     if df.empty:
         st.warning("No calls found during the selected weekday and clock-in range.")
         return
 
-    answered_df = df[df["duration"] > 0].copy()
-    missed_df = df[(df["duration"] == 0) & (df["direction"] == "INBOUND")].copy()
+    answered = df["is_answered"]
+    missed = df["is_missed_inbound"]
+    duration = minutes(df["duration_ms"])
 
     # --- Metrics
     total_calls = len(df)
-    answered_calls = len(answered_df)
-    missed_calls = len(missed_df)
-    total_talk_time = answered_df["duration"].sum()
-    avg_duration = answered_df["duration"].mean()
+    answered_calls = int(answered.sum())
+    missed_calls = int(missed.sum())
+    total_talk_time = duration[answered].sum()
+    avg_duration = duration[answered].mean()
 
     col1, col2, col3, col4, col5 = st.columns(5)
     col1.metric("Total Calls", total_calls)
@@ -79,50 +61,63 @@ def render_userwise_view(user_key, start_date, end_date):
     col5.metric("Avg Duration", format_minutes_to_hr_min(avg_duration))
 
     # --- Missed Call Table
-    if not missed_df.empty:
+    if missed_calls:
         st.subheader("Missed INBOUND Call Times")
-        missed_df["Missed Call Time"] = missed_df["startTimeEastern"].dt.strftime("%Y-%m-%d %H:%M:%S")
-        st.dataframe(missed_df[["Missed Call Time", "Caller", "Callee"]], use_container_width=True)
+        missed_table = df.loc[missed, ["startTimeEastern", "Caller", "Callee"]]
+        missed_table["startTimeEastern"] = missed_table["startTimeEastern"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        st.dataframe(missed_table.rename(columns={"startTimeEastern": "Missed Call Time"}), use_container_width=True)
 
     # --- Longest Call
     st.subheader("Longest Call")
-    if not answered_df.empty:
-        longest = answered_df.loc[answered_df["duration"].idxmax()]
-        st.write(f"{longest['startTimeEastern'].strftime('%Y-%m-%d %H:%M:%S')} — {format_minutes_to_hr_min(longest['duration'])}")
+    if answered_calls:
+        longest = duration[answered].idxmax()
+        st.write(f"{df.at[longest, 'startTimeEastern'].strftime('%Y-%m-%d %H:%M:%S')} — {format_minutes_to_hr_min(duration[longest])}")
     else:
         st.write("No answered calls found.")
 
     # --- Time Gaps > 30 Minutes
     st.subheader("Time Gaps > 30 Minutes")
-    df = df.sort_values("startTime")
-    df["prev_end"] = df["endTime"].shift()
-    df["gap"] = (df["startTime"] - df["prev_end"]).dt.total_seconds() / 60
-    gap_df = df[df["gap"] > 30][["prev_end", "startTime", "gap"]].dropna()
-
-    if not gap_df.empty:
-        gap_df["Previous Call End"] = gap_df["prev_end"].dt.tz_convert("US/Eastern").dt.strftime("%Y-%m-%d %H:%M:%S")
-        gap_df["Current Call Start"] = gap_df["startTime"].dt.tz_convert("US/Eastern").dt.strftime("%Y-%m-%d %H:%M:%S")
-        gap_df["Gap"] = gap_df["gap"].apply(format_minutes_to_hr_min)
-        st.dataframe(gap_df[["Previous Call End", "Current Call Start", "Gap"]], use_container_width=True)
+    df = annotate_gaps(df, thresholds=(30,))
+    has_gap = df["over_30"]
+
+    if has_gap.any():
+        gap_df = pd.DataFrame({
+            "Previous Call End": df.loc[has_gap, "prev_end"].dt.tz_convert("US/Eastern").dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "Current Call Start": df.loc[has_gap, "startTimeEastern"].dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "Gap": df.loc[has_gap, "gap_minutes"].apply(format_minutes_to_hr_min),
+        })
+        st.dataframe(gap_df, use_container_width=True)
     else:
         st.write("No gaps greater than 30 minutes found.")
 
-    # --- All Call Logs
+    # --- All Call Logs: paginated, so only the visible page is formatted
     st.subheader("All Call Logs")
-    full_logs = df[["startTimeEastern", "endTimeEastern", "duration", "direction", "Caller", "Callee"]].copy()
-    full_logs["startTimeEastern"] = full_logs["startTimeEastern"].dt.strftime("%Y-%m-%d %H:%M:%S")
-    full_logs["endTimeEastern"] = full_logs["endTimeEastern"].dt.strftime("%Y-%m-%d %H:%M:%S")
-    full_logs["duration"] = full_logs["duration"].apply(format_minutes_to_hr_min)
-    st.dataframe(full_logs.sort_values("startTimeEastern"), use_container_width=True)
+    render_paged_table(
+        df,
+        columns={
+            "startTimeEastern": time_text("startTimeEastern"),
+            "endTimeEastern": lambda page: with_end_times(page)[1].dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration": duration_text(),
+            "direction": raw("direction"),
+            "Caller": raw("Caller"),
+            "Callee": raw("Callee"),
+        },
+        key="userwise_logs",
+        sort_columns={"Start Time": "startTime", "Duration": "duration_ms", "Direction": "direction"},
+        search_columns=("direction", "Caller", "Callee"),
+        file_name=f"call_logs_{start_date}_{end_date}",
+    )
+
+    # --- Per-call charts are only built when asked for
+    if st.toggle("Show call timeline and gap distribution", key="userwise_timeline"):
+        st.plotly_chart(call_timeline(df), use_container_width=True)
+        st.plotly_chart(gap_histogram(df), use_container_width=True)
 
     # --- Daily Answered vs Missed Chart
     st.subheader("Daily Answered vs Missed INBOUND Calls")
-    df["date"] = df["startTimeEastern"].dt.date
-    df["is_answered"] = df["duration"] > 0
-    df["is_missed_inbound"] = (df["duration"] == 0) & (df["direction"] == "INBOUND")
-    filtered = df[df["is_answered"] | df["is_missed_inbound"]].copy()
-    filtered["Status"] = filtered["is_answered"].map({True: "Answered", False: "Missed"})
-    call_status = filtered.groupby(["date", "Status"]).size().reset_index(name="Count")
+    counted = df["is_answered"] | df["is_missed_inbound"]
+    status = df.loc[counted, "is_answered"].map({True: "Answered", False: "Missed"}).rename("Status")
+    call_status = df.loc[counted, "date"].to_frame().join(status).groupby(["date", "Status"], observed=True).size().reset_index(name="Count")
 
     fig_daily_status = px.bar(
         call_status,
@@ -139,12 +134,24 @@ def render_userwise_view(user_key, start_date, end_date):
 
     # --- Avg Duration Per Day
     st.subheader("Average Answered Call Duration Per Day")
-    if not answered_df.empty:
-        answered_df["date"] = answered_df["startTimeEastern"].dt.date
+    if answered_calls:
+        answered = df["is_answered"]
         avg_duration_daily = (
-            answered_df.groupby("date")["duration"]
+            minutes(df.loc[answered, "duration_ms"])
+            .groupby(df.loc[answered, "date"], observed=True)
             .mean()
             .reset_index(name="Avg Duration")
         )
         avg_duration_daily["Avg Duration (hr:min)"] = avg_duration_daily["Avg Duration"].apply(format_minutes_to_hr_min)
         st.dataframe(avg_duration_daily[["date", "Avg Duration (hr:min)"]], use_container_width=True)
+
+    # --- Weekly Benchmarks: read from the batch report (python -m logic.reports), not computed per render
+    st.subheader("📈 Weekly Benchmarks")
+    report = load_report("nurse_weekly")
+    rows = report[report["user_key"] == user_key] if report is not None else None
+    if rows is None or rows.empty:
+        st.caption("No benchmark report for this nurse yet; run `python -m logic.reports`.")
+    else:
+        st.caption(f"vs Baseline compares each week with the previous weeks' average. "
+                   f"Report generated {report_manifest()['generated_at']}.")
+        st.dataframe(benchmark_table(rows), use_container_width=True, hide_index=True)
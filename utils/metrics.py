@@ -0,0 +1,133 @@
+# utils/metrics.py
+# Process-wide counters and latency histograms, read by the admin panel
+# (logic/admin.py) and exported as Prometheus text by the webhook service.
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(BUCKETS) if value <= bound), len(BUCKETS))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (coarse, as in Prometheus)
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip((*BUCKETS, float("inf")), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    def __init__(self):
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> Histogram
+        self._collectors = []   # callables returning [(name, labels, value)] gauges at read time
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def register_collector(self, fn):
+        with self._lock:
+            self._collectors.append(fn)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: {"count": h.count, "sum": h.sum, "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+                      "buckets": list(h.counts)}
+                for key, h in self._histograms.items()
+            }
+            collectors = list(self._collectors)
+        gauges = {}
+        for collect in collectors:
+            for name, labels, value in collect():
+                gauges[(name, tuple(sorted(labels.items())))] = value
+        return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def prometheus(self):
+        snap = self.snapshot()
+        lines, typed = [], set()
+
+        def emit(name, kind, labels, value, family=None):
+            family = family or name
+            if family not in typed:
+                typed.add(family)
+                lines.append(f"# TYPE {family} {kind}")
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f"{name}{{{label_text}}} {value:g}" if label_text else f"{name} {value:g}")
+
+        for (name, labels), value in sorted(snap["counters"].items()):
+            emit(name, "counter", labels, value)
+        for (name, labels), value in sorted(snap["gauges"].items()):
+            emit(name, "gauge", labels, value)
+        for (name, labels), h in sorted(snap["histograms"].items()):
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, "+Inf"), h["buckets"]):
+                cumulative += count
+                emit(f"{name}_bucket", "histogram", (*labels, ("le", f"{bound}")), cumulative, name)
+            emit(f"{name}_sum", "histogram", labels, h["sum"], name)
+            emit(f"{name}_count", "histogram", labels, h["count"], name)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+count = registry.count
+observe = registry.observe
+
+
+@contextmanager
+def timer(stage, **labels):
+    # Wall time of a pipeline stage -> stage_seconds{stage=...}
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe("stage_seconds", time.perf_counter() - started, stage=stage, **labels)
+
+
+def timed(stage):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
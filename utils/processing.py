@@ -1,24 +1,144 @@
+import sys
+
 import pandas as pd
 
+from utils.metrics import timed
+
+EASTERN = "US/Eastern"
+
+# Canonical call frame consumed by every view. Compact by design: epoch-based
+# datetimes, int32 millisecond durations, categorical labels and phone numbers.
+# End times are derived on demand (see with_end_times) rather than stored.
+CALL_SCHEMA = [
+    "callId", "user_key", "nurse", "direction",
+    "startTime", "startTimeEastern", "duration_ms", "Caller", "Callee",
+    "date", "hour", "weekday", "is_answered", "is_missed_inbound",
+]
+
+_RECORD_FIELDS = ("callId", "startTime", "endTime", "duration", "direction", "Caller", "Callee")
+
+
+def format_minutes_to_hr_min(minutes):
+    if pd.isna(minutes):
+        return "0 hr 0 min"
+    hours = int(minutes // 60)
+    mins = int(minutes % 60)
+    return f"{hours} hr {mins} min"
+
+
+def minutes(duration_ms):
+    return duration_ms / 60000
+
+
+def _number(party):
+    number = party.get("number") if isinstance(party, dict) else None
+    return sys.intern(number) if isinstance(number, str) else None
+
+
+def _finish(df):
+    # Shared tail of every constructor: derived Eastern-time columns and outcome flags
+    valid = df["startTime"].notna()
+    if not valid.all():
+        df = df[valid].copy()
+    df["duration_ms"] = df["duration_ms"].fillna(0).clip(lower=0).astype("int32")
+    for column in ("user_key", "nurse", "Caller", "Callee"):
+        df[column] = df[column].astype("category")
+    df["direction"] = df["direction"].fillna("UNKNOWN").astype("category")
+    df["startTime"] = df["startTime"].astype("datetime64[ms, UTC]")
+    df["startTimeEastern"] = df["startTime"].dt.tz_convert(EASTERN)
+    df["date"] = df["startTimeEastern"].dt.date.astype("category")
+    df["hour"] = df["startTimeEastern"].dt.hour.astype("int8")
+    df["weekday"] = df["startTimeEastern"].dt.weekday.astype("int8")
+    df["is_answered"] = df["duration_ms"] > 0
+    df["is_missed_inbound"] = (df["duration_ms"] == 0) & (df["direction"] == "INBOUND")
+    return df[CALL_SCHEMA].reset_index(drop=True)
+
+
+def empty_call_frame():
+    df = pd.DataFrame({
+        "callId": pd.Series(dtype=object),
+        "user_key": pd.Series(dtype=object),
+        "nurse": pd.Series(dtype=object),
+        "direction": pd.Series(dtype=object),
+        "startTime": pd.Series(dtype="datetime64[ms, UTC]"),
+        "duration_ms": pd.Series(dtype="int64"),
+        "Caller": pd.Series(dtype=object),
+        "Callee": pd.Series(dtype=object),
+    })
+    return _finish(df)
+
+
+@timed("normalize")
+def normalize_calls(calls, user_key=None, nurse=None):
+    """Raw call-history items (any iterable, e.g. a page stream) -> canonical call frame.
+
+    Columns are filled in a single pass, so the records themselves never need
+    to be held as a list.
+    """
+    columns = {field: [] for field in _RECORD_FIELDS}
+    for call in calls:
+        columns["callId"].append(call.get("legId") or call.get("id") or call.get("callId"))
+        columns["startTime"].append(call.get("startTime"))
+        columns["endTime"].append(call.get("endTime"))
+        columns["duration"].append(call.get("duration"))
+        columns["direction"].append(call.get("direction"))
+        columns["Caller"].append(_number(call.get("caller")))
+        columns["Callee"].append(_number(call.get("callee")))
+    if not columns["startTime"]:
+        return empty_call_frame()
+
+    start = pd.to_datetime(pd.Series(columns["startTime"], dtype=object), errors="coerce", utc=True)
+
+    # GoTo reports duration in milliseconds; fall back to endTime - startTime when it is absent
+    duration_ms = pd.to_numeric(pd.Series(columns["duration"], dtype=object), errors="coerce")
+    if any(columns["endTime"]):
+        end = pd.to_datetime(pd.Series(columns["endTime"], dtype=object), errors="coerce", utc=True)
+        duration_ms = duration_ms.fillna((end - start).dt.total_seconds() * 1000)
+
+    df = pd.DataFrame({
+        "callId": columns["callId"],
+        "user_key": user_key,
+        "nurse": nurse,
+        "direction": columns["direction"],
+        "startTime": start,
+        "duration_ms": duration_ms,
+        "Caller": columns["Caller"],
+        "Callee": columns["Callee"],
+    })
+    return _finish(df)
+
+
+@timed("normalize")
+def normalize_call_rows(rows, nurse_names=None):
+    """Typed rows from CallStore.load_call_rows -> canonical call frame."""
+    if not rows:
+        return empty_call_frame()
+    raw = pd.DataFrame.from_records(
+        rows, columns=["user_key", "callId", "start_ts", "duration_ms", "direction", "Caller", "Callee"]
+    )
+    raw["nurse"] = raw["user_key"].map(nurse_names) if nurse_names else None
+    raw["startTime"] = pd.to_datetime(raw["start_ts"], unit="ms", utc=True)
+    return _finish(raw)
+
+
+def with_end_times(df):
+    # End times for the rows actually being displayed or gap-checked
+    end = df["startTime"] + pd.to_timedelta(df["duration_ms"], unit="ms")
+    return end, end.dt.tz_convert(EASTERN)
+
+
 def analyze_calls(calls):
-    df = pd.DataFrame(calls)
+    df = normalize_calls(calls)
     if df.empty:
         return None
 
-    df["startTime"] = pd.to_datetime(df["startTime"], utc=True)
-    df["duration"] = pd.to_numeric(df["duration"], errors="coerce")
-    df["endTime"] = df["startTime"] + pd.to_timedelta(df["duration"], unit="s")
-    df["duration_minutes"] = df["duration"] / 60
-
-    df["direction"] = df["direction"].fillna("UNKNOWN")
-
     # Identify missed calls: assume duration = 0 is missed
-    df["missed"] = df["duration"] == 0
+    missed = ~df["is_answered"]
 
     return {
         "df": df,
         "total_calls": len(df),
-        "missed_calls": df["missed"].sum(),
-        "incoming": len(df[df["direction"] == "INBOUND"]),
-        "outgoing": len(df[df["direction"] == "OUTBOUND"]),
+        "missed_calls": int(missed.sum()),
+        "incoming": int((df["direction"] == "INBOUND").sum()),
+        "outgoing": int((df["direction"] == "OUTBOUND").sum()),
     }
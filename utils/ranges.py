@@ -0,0 +1,26 @@
+# utils/ranges.py
+# Sidebar date presets and their UTC query bounds. The dashboard and the
+# prefetcher both go through here, so their cache keys match exactly.
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+PRESETS = ("Day", "Week", "Month")
+
+
+def preset_range(option, today=None):
+    today = today or datetime.today().date()
+    if option == "Day":
+        return today, today
+    if option == "Week":
+        return today - timedelta(days=7), today
+    if option == "Month":
+        return today.replace(day=1), today
+    raise ValueError(f"Unknown date preset: {option}")
+
+
+def eastern_bounds(start_date, end_date):
+    # Whole Eastern days -> ("YYYY-MM-DDTHH:MM:SSZ", ...) in UTC
+    eastern = ZoneInfo("US/Eastern")
+    shift_start = datetime.combine(start_date, datetime.min.time(), eastern).astimezone(timezone.utc)
+    shift_end = datetime.combine(end_date, datetime.max.time(), eastern).astimezone(timezone.utc)
+    return shift_start.strftime("%Y-%m-%dT%H:%M:%SZ"), shift_end.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -0,0 +1,107 @@
+# utils/tables.py
+# Paginated log tables: sorting and filtering run on the typed call-frame columns;
+# only the visible page (or one export chunk at a time) is formatted as text, and
+# exports are built only when a download is clicked.
+import importlib.util
+import io
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.processing import format_minutes_to_hr_min, minutes
+
+PAGE_SIZES = (50, 100, 250, 500)
+EXPORT_CHUNK_ROWS = 5000
+
+
+# --- Column formatters: each takes the page frame and returns a display column
+def time_text(column):
+    return lambda page: page[column].dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def duration_text(column="duration_ms"):
+    return lambda page: minutes(page[column]).apply(format_minutes_to_hr_min)
+
+
+def raw(column):
+    return lambda page: page[column]
+
+
+def format_rows(df, columns):
+    # columns: {label: formatter}
+    return pd.DataFrame({label: fmt(df).to_numpy() for label, fmt in columns.items()})
+
+
+def filter_rows(df, query, search_columns):
+    # Case-insensitive substring match; categorical columns are matched on their categories only
+    mask = np.zeros(len(df), dtype=bool)
+    for column in search_columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            hits = np.flatnonzero(series.cat.categories.astype(str).str.contains(query, case=False, regex=False))
+            mask |= series.cat.codes.isin(hits).to_numpy()
+        else:
+            mask |= series.astype(str).str.contains(query, case=False, regex=False).to_numpy()
+    return df[mask]
+
+
+# --- Chunked exports
+def iter_csv(df, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    for offset in range(0, len(df), chunk_rows):
+        chunk = format_rows(df.iloc[offset:offset + chunk_rows], columns)
+        yield chunk.to_csv(index=False, header=offset == 0).encode()
+
+
+def has_parquet():
+    # Optional: Parquet export is only offered when pyarrow is installed
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def parquet_bytes(df, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    buffer, writer = io.BytesIO(), None
+    for offset in range(0, len(df), chunk_rows):
+        table = pa.Table.from_pandas(format_rows(df.iloc[offset:offset + chunk_rows], columns), preserve_index=False)
+        writer = writer or pq.ParquetWriter(buffer, table.schema)
+        writer.write_table(table)
+    if writer is not None:
+        writer.close()
+    return buffer.getvalue()
+
+
+# --- Streamlit widget
+def render_paged_table(df, columns, key, sort_columns, search_columns=(), descending=False, file_name="calls"):
+    """Shows df one page at a time.
+
+    columns: {label: formatter} for the displayed/exported columns.
+    sort_columns: {label: backing column} offered in the sort picker (first is the default).
+    """
+    col1, col2, col3, col4 = st.columns([2, 1, 3, 1])
+    sort_label = col1.selectbox("Sort by", list(sort_columns), key=f"{key}_sort")
+    desc = col2.toggle("Descending", value=descending, key=f"{key}_desc")
+    query = col3.text_input("Filter", key=f"{key}_filter", placeholder="Number, direction, nurse...").strip()
+    page_size = col4.selectbox("Rows", PAGE_SIZES, key=f"{key}_size")
+
+    view = filter_rows(df, query, search_columns) if query and search_columns else df
+    view = view.sort_values(sort_columns[sort_label], ascending=not desc, kind="stable")
+
+    pages = max(1, math.ceil(len(view) / page_size))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    first = (min(page, pages) - 1) * page_size
+    visible = view.iloc[first:first + page_size]
+
+    st.dataframe(format_rows(visible, columns), use_container_width=True, hide_index=True)
+    st.caption(f"Rows {first + 1 if len(view) else 0}–{first + len(visible)} of {len(view)} (page {page} of {pages})")
+
+    if len(view):
+        # Callables: the file is generated on click, off the script thread, never on a plain rerun
+        export1, export2 = st.columns(2)
+        export1.download_button("⬇️ Download CSV", lambda: b"".join(iter_csv(view, columns)), f"{file_name}.csv",
+                                "text/csv", key=f"{key}_csv", on_click="ignore")
+        if has_parquet():
+            export2.download_button("⬇️ Download Parquet", lambda: parquet_bytes(view, columns),
+                                    f"{file_name}.parquet", "application/octet-stream", key=f"{key}_parquet",
+                                    on_click="ignore")